@@ -5,6 +5,7 @@ from dashboard_fixed import show_dashboard
 from news import show_news
 from chatbot import show_chatbot
 from game import show_game
+from screener import show_screener
 
 # Initialize authentication state
 if 'authenticated' not in st.session_state:
@@ -18,7 +19,7 @@ else:
         st.session_state.active_tab = 'dashboard'
 
     query_params = st.query_params
-    if 'tab' in query_params and query_params['tab'] in ['dashboard', 'news', 'chatbot', 'game']:
+    if 'tab' in query_params and query_params['tab'] in ['dashboard', 'screener', 'news', 'chatbot', 'game']:
         st.session_state.active_tab = query_params['tab']
 
     st.set_page_config("MasteringMarket", layout="wide")
@@ -37,18 +38,21 @@ else:
     
     # st.image("images.jpg", width='stretch')
 
-    tab1, tab2, tab3, tab4 = st.tabs(["Stock Analysis Dashboard", "News and Current Affairs", "Chatbot", "Portfolio Game"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Stock Analysis Dashboard", "Stock Screener", "News and Current Affairs", "Chatbot", "Portfolio Game"])
 
     with tab1:
         show_dashboard()
 
     with tab2:
-        show_news()
+        show_screener()
 
     with tab3:
-        show_chatbot()
+        show_news()
 
     with tab4:
+        show_chatbot()
+
+    with tab5:
         show_game()
 
 # Custom CSS for background and styling
@@ -104,7 +108,7 @@ st.markdown(
     }
     </style>
     <div class="stock-doodle"></div>
-    <div class="chatbot-icon" onclick="document.querySelector('button[data-baseweb=tab]:nth-child(3)').click()">
+    <div class="chatbot-icon" onclick="document.querySelector('button[data-baseweb=tab]:nth-child(4)').click()">
         <img src="https://img.icons8.com/material-outlined/24/ffffff/chat.png" alt="Chat">
     </div>
     """,
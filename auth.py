@@ -1,61 +1,45 @@
 import streamlit as st
 import sqlite3
-import hashlib
 from datetime import datetime
+from db import connection, transaction
+from passwords import hash_password_async, verify_password_async, dummy_hash
+import trade_journal
+from sessions import issue_token, validate_token, revoke_token, issue_nonce, redeem_nonce
 
-def init_auth_db():
-    """Initialize the authentication database"""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  email TEXT UNIQUE NOT NULL,
-                  password TEXT NOT NULL,
-                  name TEXT NOT NULL,
-                  created_at TEXT NOT NULL)''')
-    conn.commit()
-    conn.close()
-
-def hash_password(password):
-    """Hash a password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Query parameter holding a remembered session's one-time nonce, so a refresh or a new tab restores it
+SESSION_PARAM = "session"
 
 def create_user(email, password, name):
     """Create a new user account"""
-    init_auth_db()
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     try:
-        hashed_password = hash_password(password)
-        c.execute("INSERT INTO users (email, password, name, created_at) VALUES (?, ?, ?, ?)",
-                  (email, hashed_password, name, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-        conn.commit()
+        hashed_password = hash_password_async(password).result()
+        with transaction() as conn:
+            conn.execute("INSERT INTO users (email, password, name, created_at) VALUES (?, ?, ?, ?)",
+                         (email, hashed_password, name, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
         return True, "Account created successfully!"
     except sqlite3.IntegrityError:
         return False, "Email already exists. Please use a different email."
     except Exception as e:
         return False, f"Error creating account: {str(e)}"
-    finally:
-        conn.close()
 
 def verify_user(email, password):
-    """Verify user credentials"""
-    init_auth_db()
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
+    """Verify user credentials, upgrading the stored hash if it uses an old scheme or cost"""
     try:
-        hashed_password = hash_password(password)
-        c.execute("SELECT id, email, name FROM users WHERE email = ? AND password = ?",
-                  (email, hashed_password))
-        user = c.fetchone()
-        if user:
+        with connection() as conn:
+            user = conn.execute("SELECT id, email, name, password FROM users WHERE email = ?", (email,)).fetchone()
+        # Unknown emails are checked against a dummy hash so they take as long as a wrong password
+        matches, needs_rehash = verify_password_async(password, user[3] if user else dummy_hash()).result()
+        if user and matches:
+            if needs_rehash:
+                rehashed = hash_password_async(password).result()
+                with transaction() as conn:
+                    conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                                 (rehashed, user[0], user[3]))
             return True, {"id": user[0], "email": user[1], "name": user[2]}
         else:
             return False, "Invalid email or password."
     except Exception as e:
         return False, f"Error verifying credentials: {str(e)}"
-    finally:
-        conn.close()
 
 def show_login_page():
     """Display the login/signup page"""
@@ -92,16 +76,13 @@ def show_login_page():
         st.subheader("Login to Your Account")
         email = st.text_input("Email", key="login_email", placeholder="Enter your email")
         password = st.text_input("Password", type="password", key="login_password", placeholder="Enter your password")
+        remember = st.checkbox("Remember me", key="login_remember")
         
         if st.button("Login", key="login_button"):
             if email and password:
                 success, result = verify_user(email, password)
                 if success:
-                    st.session_state.authenticated = True
-                    st.session_state.user = result
-                    st.session_state.user_email = result["email"]
-                    st.session_state.user_name = result["name"]
-                    st.session_state.user_id = result["email"]  # Use email as user_id for game scores
+                    start_session(result, remember=remember)
                     st.success(f"Welcome back, {result['name']}!")
                     st.rerun()
                 else:
@@ -130,11 +111,7 @@ def show_login_page():
                         # Verify and login the user
                         verify_success, user_data = verify_user(email, password)
                         if verify_success:
-                            st.session_state.authenticated = True
-                            st.session_state.user = user_data
-                            st.session_state.user_email = user_data["email"]
-                            st.session_state.user_name = user_data["name"]
-                            st.session_state.user_id = user_data["email"]  # Use email as user_id for game scores
+                            start_session(user_data)
                             st.success(f"Welcome, {user_data['name']}! You have been automatically logged in.")
                             st.rerun()
                         else:
@@ -144,20 +121,59 @@ def show_login_page():
             else:
                 st.warning("Please fill in all fields.")
 
+def _set_user(user):
+    st.session_state.authenticated = True
+    st.session_state.user = user
+    st.session_state.user_email = user["email"]
+    st.session_state.user_name = user["name"]
+    st.session_state.user_id = user["email"]  # Use email as user_id for game scores
+
+def _clear_user():
+    st.session_state.authenticated = False
+    for key in ['user', 'user_email', 'user_name', 'user_id', 'session_token']:
+        if key in st.session_state:
+            del st.session_state[key]
+    trade_journal.clear(st.session_state)
+
+def start_session(user, remember=False):
+    """Log a verified user in with a signed session token (and a one-time nonce in the URL when remembered)"""
+    token = issue_token(user, remember=remember)
+    st.session_state.session_token = token
+    if remember:
+        st.query_params[SESSION_PARAM] = issue_nonce(token)
+    _set_user(user)
+
 def is_authenticated():
-    """Check if user is authenticated"""
-    return st.session_state.get('authenticated', False)
+    """Check if user is authenticated, restoring the session from its signed token without a database lookup"""
+    token = st.session_state.get('session_token')
+    redeemed = False
+    if token is None and SESSION_PARAM in st.query_params:
+        # A reload or new tab of a remembered session: the nonce is used up here
+        # and replaced below, so a copied or stale link doesn't log anyone in
+        token = redeem_nonce(st.query_params[SESSION_PARAM])
+        del st.query_params[SESSION_PARAM]
+        redeemed = token is not None
+    claims = validate_token(token) if token else None
+    if claims is None:
+        # Expired, revoked or tampered with
+        if SESSION_PARAM in st.query_params:
+            del st.query_params[SESSION_PARAM]
+        if st.session_state.get('authenticated', False):
+            _clear_user()
+        return False
+    if not st.session_state.get('authenticated', False):
+        st.session_state.session_token = token
+        _set_user({"id": claims["uid"], "email": claims["email"], "name": claims["name"]})
+    if redeemed:
+        st.query_params[SESSION_PARAM] = issue_nonce(token)
+    return True
 
 def logout():
     """Logout the current user"""
-    st.session_state.authenticated = False
-    if 'user' in st.session_state:
-        del st.session_state['user']
-    if 'user_email' in st.session_state:
-        del st.session_state['user_email']
-    if 'user_name' in st.session_state:
-        del st.session_state['user_name']
-    if 'user_id' in st.session_state:
-        del st.session_state['user_id']
+    token = st.session_state.get('session_token')
+    if token:
+        revoke_token(token)
+    if SESSION_PARAM in st.query_params:
+        del st.query_params[SESSION_PARAM]
+    _clear_user()
     st.rerun()
-
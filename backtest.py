@@ -0,0 +1,157 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import price_store
+from features import lag_training_set
+from model_registry import FEATURES, get_model
+
+# Walk-forward evaluation of the lag model. At every origin the model is fitted
+# only on the rows before it and predicts the next close; the fits for all
+# origins of a ticker come from cumulative X'X / X'y sums and one batched solve,
+# so a ticker costs a handful of array operations however long its history is.
+# Tickers are spread over a process pool.
+LAGS = len(FEATURES)
+
+# Rows a fit needs before its first prediction
+MIN_TRAIN = 60
+
+COLUMNS = ['Symbol', 'Predictions', 'MAE', 'MAE %', 'Directional Accuracy %', 'Strategy Return %', 'Buy & Hold Return %']
+
+
+def _solve(xtx, xty):
+    """Batched solve of the normal equations, falling back to the pseudo-inverse for singular ones"""
+    try:
+        return np.linalg.solve(xtx, xty[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.einsum('nij,nj->ni', np.linalg.pinv(xtx), xty)
+
+
+def walk_forward(close, min_train=MIN_TRAIN, window=None):
+    """Predictions for every origin after min_train rows: (last closes, predicted, actual).
+
+    With `window` each fit uses only that many most recent rows instead of all
+    earlier ones.
+    """
+    lags, target = lag_training_set(close, LAGS)
+    n = len(target)
+    if n <= min_train:
+        return None
+    # Measuring prices from the first close keeps the sums well conditioned; the
+    # intercept absorbs the shift
+    shift = close[0]
+    design = np.column_stack([np.ones(n), lags - shift])
+    xtx = np.cumsum(design[:, :, None] * design[:, None, :], axis=0)
+    xty = np.cumsum(design * (target - shift)[:, None], axis=0)
+    if window:
+        xtx[window:] -= xtx[:-window].copy()
+        xty[window:] -= xty[:-window].copy()
+    origins = np.arange(min_train, n)
+    # Fit for origin t uses rows 0..t-1 (the sums through row t-1)
+    params = _solve(xtx[origins - 1], xty[origins - 1])
+    predicted = np.einsum('ij,ij->i', design[origins], params) + shift
+    return lags[origins, 0], predicted, target[origins]
+
+
+def fixed_model(close, coef, intercept):
+    """Predictions of an already trained model at every origin: (last closes, predicted, actual)"""
+    lags, target = lag_training_set(close, LAGS)
+    if len(target) == 0:
+        return None
+    return lags[:, 0], lags @ coef + intercept, target
+
+
+def metrics(last, predicted, actual):
+    """MAE, directional accuracy and the return of going long when a rise is predicted (flat otherwise)"""
+    moves = actual - last
+    predicted_moves = predicted - last
+    # Days without a move can't be called right or wrong
+    moved = moves != 0
+    daily_returns = moves / last
+    position = predicted_moves > 0
+    return {
+        'Predictions': len(actual),
+        'MAE': np.abs(predicted - actual).mean(),
+        'MAE %': (np.abs(predicted - actual) / actual).mean() * 100,
+        'Directional Accuracy %': (np.sign(moves[moved]) == np.sign(predicted_moves[moved])).mean() * 100
+        if moved.any() else np.nan,
+        'Strategy Return %': (np.prod(1 + daily_returns * position) - 1) * 100,
+        'Buy & Hold Return %': (actual[-1] / last[0] - 1) * 100,
+    }
+
+
+def backtest_ticker(ticker_symbol, period, min_train=MIN_TRAIN, window=None, params=None):
+    """Backtest one ticker from the price store; `params` = (coef, intercept) evaluates a fixed model"""
+    _, close = price_store.load_closes(ticker_symbol, period)
+    close = close[np.isfinite(close)]
+    if len(close) <= LAGS:
+        return None
+    if params is None:
+        result = walk_forward(close, min_train, window)
+    else:
+        result = fixed_model(close, *params)
+    if result is None:
+        return None
+    return {'Symbol': ticker_symbol, **metrics(*result)}
+
+
+def _backtest_ticker(args):
+    try:
+        return backtest_ticker(*args)
+    except Exception as e:
+        print(f"Skipping {args[0]}: {e}")
+        return None
+
+
+def backtest(tickers, period="10y", min_train=MIN_TRAIN, window=None, served_model=False, max_workers=None):
+    """Backtest every ticker; returns one row of metrics per ticker that had enough history.
+
+    With served_model the model the dashboard serves is evaluated as is instead of
+    being refitted walk-forward (its training rows are then in-sample).
+    """
+    price_store.init_price_db()
+    model = get_model() if served_model else None
+    jobs = [(ticker_symbol, period, min_train, window, model.params_for(ticker_symbol) if model else None)
+            for ticker_symbol in tickers]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        rows = [row for row in pool.map(_backtest_ticker, jobs, chunksize=16) if row is not None]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def summarize(results):
+    """Universe-wide metrics, weighting each ticker by its number of predictions"""
+    if results.empty:
+        return {}
+    weights = results['Predictions']
+    summary = {'Tickers': len(results), 'Predictions': int(weights.sum())}
+    for column in ['MAE %', 'Directional Accuracy %']:
+        valid = results[column].notna()
+        summary[column] = np.average(results.loc[valid, column], weights=weights[valid])
+    summary['Mean Strategy Return %'] = results['Strategy Return %'].mean()
+    summary['Mean Buy & Hold Return %'] = results['Buy & Hold Return %'].mean()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the price prediction model")
+    parser.add_argument("symbols", nargs="*", help="Symbols to backtest (default: the dashboard universe)")
+    parser.add_argument("--all", action="store_true", help="Use every NSE symbol in the symbol master")
+    parser.add_argument("--period", default="10y")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN, help="Rows before the first prediction")
+    parser.add_argument("--window", type=int, default=None, help="Fit on a rolling window of this many rows")
+    parser.add_argument("--served", action="store_true", help="Evaluate the served model instead of refitting")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--csv", help="Write per-ticker results to this file")
+    args = parser.parse_args()
+
+    from symbols import nse_tickers, get_symbol_index
+    if args.all:
+        symbols = [symbol for _, symbol in get_symbol_index().entries]
+    else:
+        symbols = args.symbols or list(nse_tickers.values())
+    results = backtest(symbols, args.period, args.min_train, args.window, args.served, args.workers)
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+    print(results.to_string(index=False))
+    for name, value in summarize(results).items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
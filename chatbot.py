@@ -1,6 +1,6 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
-from dashboard_fixed import nse_tickers, fetch_stock_data
+from dashboard_fixed import fetch_stock_data, select_ticker
 import streamlit as st
 from langgraph.prebuilt import create_react_agent
 from langchain_tavily import TavilySearch
@@ -128,13 +128,11 @@ def show_chatbot():
         col1, col2 = st.columns(2)
         
         with col1:
-            stock1 = st.selectbox("Select First Stock", list(nse_tickers.keys()), key="stock1")
-            ticker_symbol1 = nse_tickers[stock1]
+            stock1, ticker_symbol1 = select_ticker("Select First Stock", key="stock1")
             time_period1 = st.selectbox("Time Period", ["1d", "5d", "1mo"], index=2, key="time1")
         
         with col2:
-            stock2 = st.selectbox("Select Second Stock", list(nse_tickers.keys()), key="stock2")
-            ticker_symbol2 = nse_tickers[stock2]
+            stock2, ticker_symbol2 = select_ticker("Select Second Stock", key="stock2")
             time_period2 = st.selectbox("Time Period", ["1d", "5d", "1mo"], index=2, key="time2")
         
         if st.button("Fetch Comparison Data"):
@@ -1,63 +1,65 @@
 import streamlit as st
-import joblib
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import yfinance as yf
-from datetime import datetime
-
-# NSE Ticker names
-nse_tickers = {
-    "Wockhardt Ltd.": "WOCKPHARMA.NS",
-    "Zee Entertainment Enterprises Ltd.": "ZEEL.NS",
-    "V-Guard Industries Ltd.": "VGUARD.NS",
-    "Usha Martin Ltd.": "USHAMART.NS",
-    "Tejas Networks Ltd.": "TEJASNET.NS",
-    "Sundram Fasteners Ltd.": "SUNDRMFAST.NS",
-    "Rainbow Childrens Medicare Ltd.": "RAINBOW.NS",
-    "Ola Electric Mobility Ltd.": "OLAELEC.NS",
-    "Niva Bupa Health Insurance Company Ltd.": "NIVABUPA.NS",
-    "CreditAccess Grameen Ltd.": "CREDITACC.NS",
-    "Central Bank of India": "CENTRALBK.NS",
-    "Clean Science and Technology Ltd.": "CLEAN.NS",
-    "Aditya Birla Real Estate Ltd.": "ABREL.NS",
-    "ACME Solar Holdings Ltd.": "ACMESOLAR.NS",
-    "Ashok Leyland Ltd.": "ASHOKLEY.NS",
-    "BSE Ltd.": "BSE.NS",
-    "Dixon Technologies (India) Ltd.": "DIXON.NS",
-    "Fortis Healthcare Ltd.": "FORTIS.NS",
-    "Coforge Ltd.": "COFORGE.NS",
-    "Indus Towers Ltd.": "INDUSTOWER.NS",
-    "Jubilant Foodworks Ltd.":"JUBLFOOD.NS",
-    "Page Industries Ltd.":"PAGEIND.NS",
-    "Yes Bank Ltd.":"YESBANK.NS"
-}
+from features import latest_lags
+from figure_cache import data_version, get_figure
+from exports import available_formats, bundle_bytes, export_frame, export_history, file_name, mime_type
+from downsample import downsample_series, downsample_ohlc, LINE_POINTS, CANDLE_POINTS
+from forecast import forecast_all, update_prices
+from fundamentals import get_fundamentals
+from model_registry import MODEL_TYPES, get_predictor
+from indicators import engine as indicator_engine
+from price_store import get_history, load_rollups
+from rollups import top_volume_months, format_yearly, format_monthly, format_dates
+from quotes import get_quotes
+from shared_cache import shared_cache
+from symbols import nse_tickers, INDEX_TICKERS, get_symbol_index
+import refresher
+
+# Periods long enough for the yearly and monthly analysis
+LONG_PERIODS = ["1y", "2y", "5y", "10y", "max"]
+
+def select_ticker(label, key):
+    """Search box plus a short selectbox of matches; returns (company name, symbol).
+
+    Shows the featured tickers until something is typed, so the browser never
+    receives the full NSE list.
+    """
+    query = st.text_input(f"Search {label}", key=f"{key}_search", placeholder="Company name or symbol")
+    matches = get_symbol_index().search(query, k=20) if query.strip() else list(nse_tickers.items())
+    if not matches:
+        st.warning(f"No stocks match '{query}'. Showing featured stocks.")
+        matches = list(nse_tickers.items())
+    options = dict(matches)
+    name = st.selectbox(label, list(options), key=key)
+    return name, options[name]
+
+@shared_cache(ttl=60, maxsize=512)
+def _cached_history(ticker_symbol, time):
+    return get_history(ticker_symbol, time)
 
 def fetch_stock_data(ticker, time, ticker_symbol):
-    ticker = yf.Ticker(ticker_symbol)
-    data = ticker.history(period=time, auto_adjust=True)
-    data.reset_index(inplace=True)
-    data['Date'] = data['Date'].astype(str)
-    data.Date = data.Date.str.split(" ").str[0]
-    return data
+    # Served from the local price store; only bars newer than the last stored date are downloaded.
+    # The cached frame is shared by every session, so hand out a copy.
+    return _cached_history(ticker_symbol, time).copy()
+
+# Index levels are kept fresh by the background refresher
+refresher.register("indices", lambda: get_quotes(list(INDEX_TICKERS.values())), interval=60)
 
 def get_index_display():
-    tickers = {
-        "Sensex": "^BSESN",
-        "Nifty 50": "^NSEI",
-        "Bank Nifty": "^NSEBANK",
-        "Nifty IT": "^CNXIT",
-        "India VIX": "^INDIAVIX"
-    }
+    quotes, age = refresher.get_snapshot("indices")
+    if quotes is None:
+        return "Loading index data..."
     display = []
-    for name, symbol in tickers.items():
-        index = yf.Ticker(symbol)
-        data = index.history(period="1d")
-        if not data.empty:
-            latest_value = data['Close'].iloc[-1]
-            display.append(f"{name} today ({datetime.now().date()}): {latest_value:.2f}")
+    for name, symbol in INDEX_TICKERS.items():
+        latest_value = quotes.loc[symbol, 'Close']
+        if pd.notna(latest_value):
+            display.append(f"{name} ({quotes.loc[symbol, 'Date']}): {latest_value:.2f}")
         else:
             display.append(f"{name}: ❌ Data not available")
+    display.append(f"Updated {int(age)}s ago")
     return "  |  ".join(display)
 
 def show_dashboard():
@@ -77,10 +79,9 @@ def show_dashboard():
     )
 
     st.header("User Input")
-    ticker = st.selectbox("Select Stock Ticker", list(nse_tickers.keys()))
-    ticker_symbol = nse_tickers[ticker]
+    ticker, ticker_symbol = select_ticker("Select Stock Ticker", key="dashboard_ticker")
 
-    time = st.selectbox("Select Time Period", ["1d", "5d", "1mo"], index=2)
+    time = st.selectbox("Select Time Period", ["1d", "5d", "1mo", "3mo", "6mo"] + LONG_PERIODS, index=2)
 
     data = fetch_stock_data(ticker, time, ticker_symbol)
 
@@ -93,7 +94,7 @@ def show_dashboard():
     col1 , col2 , col3 = st.columns(3)
     with col1:
         st.subheader("Date")
-        st.write(data['Date'].iloc[-1])
+        st.write(data.index[-1].strftime('%Y-%m-%d'))
     with col2:
         st.subheader("Today's Price")
         st.write(f"{data['Close'].iloc[-1]:.2f} INR")
@@ -123,35 +124,56 @@ def show_dashboard():
 
     if full_data:
         st.subheader(f"Full Stock Data for {ticker} for ({time})")
-        st.dataframe(data)
+        st.dataframe(format_dates(data))
     else:
         st.subheader(f"Stock Data for {ticker} for Last 10 days")
-        st.dataframe(data.tail(10))
+        st.dataframe(format_dates(data.tail(10)))
 
+    # Files are only generated when a download button is clicked
+    export_format = st.selectbox("Export format", available_formats(), key="export-format")
     st.download_button(
         label="Download Data",   
-        data=data.to_csv(index=False).encode('utf-8'),
-        file_name=f"{ticker}_stock_data.csv",
-        mime="text/csv",
+        data=lambda: export_history(data, export_format),
+        file_name=file_name(f"{ticker}_stock_data", export_format),
+        mime=mime_type(export_format),
         key="download-csv"
     )
 
-    if st.checkbox("Show Stock information", value=True):
-        ticker_info = yf.Ticker(ticker_symbol).info
-        new_info = ticker_info.copy()
-        st.subheader(f"Stock Information for {ticker}")
-        ticker_info = {k: v for k, v in ticker_info.items() }
-        ticker_info = pd.DataFrame(ticker_info.items(), columns=['Attribute', 'Value'])
-        print(ticker_info)
-        st.dataframe(ticker_info.head(10))
+    with st.expander("Bulk export"):
+        bundle_tickers = st.multiselect("Tickers", list(dict.fromkeys([ticker_symbol, *nse_tickers.values()])), default=[ticker_symbol], key="bundle-tickers")
+        bundle_period = st.selectbox("Period", LONG_PERIODS, index=len(LONG_PERIODS) - 1, key="bundle-period")
+        st.caption("Exports the bars already in the local price store.")
         st.download_button(
-            label="Download Stock Information",
-            data=ticker_info.to_csv(index=False).encode('utf-8'),
-            file_name=f"{ticker}_stock_info.txt",
-            mime="text/csv",
-            key="download-info"
+            label="Download Bundle",
+            data=lambda: bundle_bytes(bundle_tickers, bundle_period, export_format),
+            file_name=f"stock_data_{bundle_period}.zip",
+            mime="application/zip",
+            key="download-bundle",
+            disabled=not bundle_tickers
         )
 
+    # Only the displayed fields, refreshed at most once a day per ticker
+    try:
+        new_info = get_fundamentals(ticker_symbol)
+    except Exception as e:
+        print(f"Fundamentals unavailable for {ticker_symbol}: {e}")
+        new_info = {}
+
+    if st.checkbox("Show Stock information", value=True):
+        st.subheader(f"Stock Information for {ticker}")
+        if not new_info:
+            st.info("Stock information is not available for this ticker right now.")
+        else:
+            ticker_info = pd.DataFrame(new_info.items(), columns=['Attribute', 'Value'])
+            st.dataframe(ticker_info)
+            st.download_button(
+                label="Download Stock Information",
+                data=lambda: export_frame(ticker_info, "CSV"),
+                file_name=f"{ticker}_stock_info.txt",
+                mime="text/csv",
+                key="download-info"
+            )
+
     # Stock Basic Information
     st.write("-----------------------------------------------------------------------")
     col1 , col2, col3 = st.columns(3)
@@ -163,178 +185,209 @@ def show_dashboard():
         st.write(ticker)
     with col3:
         st.subheader("50 Day Average")
-        st.write(f"{new_info.get('fiftyDayAverage', 'N/A')} INR")
+        st.write(f"{new_info.get('fiftyDayAverage') or 'N/A'} INR")
 
     col4, col5, col6 = st.columns(3)
     with col4:
         st.subheader("Market Cap")
-        st.write(f"{new_info.get('marketCap', 'N/A')} INR")
+        st.write(f"{new_info.get('marketCap') or 'N/A'} INR")
     with col5:
         st.subheader("52 Week Low")
-        st.write(f"{new_info.get('fiftyTwoWeekLow')} INR")
+        st.write(f"{new_info.get('fiftyTwoWeekLow') or 'N/A'} INR")
     with col6:
         st.subheader("52 Week High")
-        st.write(f"{new_info.get('fiftyTwoWeekHigh', 'N/A')} INR")
+        st.write(f"{new_info.get('fiftyTwoWeekHigh') or 'N/A'} INR")
 
     st.write("-----------------------------------------------------------------------")
+    # Charts are downsampled to a fixed number of points; zooming into a date range
+    # re-renders that slice at a higher resolution.
+    chart_mask = np.ones(len(data), dtype=bool)
+    if len(data) > LINE_POINTS:
+        first_day, last_day = data.index[0].date(), data.index[-1].date()
+        zoom = st.slider("Chart date range", min_value=first_day, max_value=last_day,
+                         value=(first_day, last_day), key=f"chart_zoom_{ticker_symbol}_{time}")
+        chart_mask = (data.index.date >= zoom[0]) & (data.index.date <= zoom[1])
+    chart_data = data[chart_mask]
+
+    # Figures are cached per (ticker, period, data version, chart type) across reruns
+    # and sessions; only a change in the data or the zoom range rebuilds them.
+    version = data_version(data)
+    zoom_range = (chart_data.index[0], chart_data.index[-1]) if len(chart_data) else None
+
+    def cached_chart(chart_type, build, *extra):
+        return get_figure((ticker_symbol, time, version, chart_type, zoom_range) + extra, build)
+
+    def close_chart():
+        close = downsample_series(chart_data['Close'])
+        fig = px.line(x=close.index, y=close.values, title=f"Closing Price of {ticker} for {time}")
+        fig.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white')
+        fig.update_layout(xaxis_title='Date', yaxis_title='Closing Price (INR)')
+        return fig
+
+    def open_chart():
+        opening = downsample_series(chart_data['Open'])
+        fig = px.line(x=opening.index, y=opening.values, title=f"Opening Price of {ticker} for {time}")
+        fig.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white' )
+        fig.update_traces(line=dict(color='green'))
+        fig.update_layout(xaxis_title='Date', yaxis_title='Opening Price (INR)')
+        return fig
+
+    def candlestick_chart():
+        candles = downsample_ohlc(chart_data, CANDLE_POINTS)
+        fig = go.Figure(data=[go.Candlestick(x=candles.index,
+                        open=candles['Open'],
+                        high=candles['High'],
+                        low=candles['Low'],
+                        close=candles['Close'])])
+
+        fig.update_layout(
+            title='Stock Price Candlestick Chart',
+            xaxis_title='Date',
+            yaxis_title='Price',
+            xaxis_rangeslider_visible=False
+        )
+        return fig
+
+    def moving_average_chart():
+        fig = go.Figure()
+
+        # Calculate 50-day and 200-day Simple Moving Averages (SMA)
+        # Adjust window size based on available data
+        data_length = len(data)
+        window_50 = min(50, data_length)
+        window_200 = min(200, data_length)
+
+        # Ensure the two SMAs use different window sizes; otherwise they overlap and look like one line
+        if window_50 == window_200 and window_200 > 1:
+            window_50 = max(1, window_200 // 2)
+
+        # Use min_periods=1 so SMA lines are visible even for short time ranges.
+        # Indicator state is cached per ticker, so reruns only feed bars added since the last one.
+        sma_50 = indicator_engine.series(ticker_symbol, data, "sma", window=window_50, min_periods=1)
+        sma_200 = indicator_engine.series(ticker_symbol, data, "sma", window=window_200, min_periods=1)
+
+        # Use Date for x-axis to be consistent with other charts
+        close = downsample_series(chart_data['Close'])
+        sma_50 = downsample_series(pd.Series(sma_50, index=data.index)[chart_mask])
+        sma_200 = downsample_series(pd.Series(sma_200, index=data.index)[chart_mask])
+        fig.add_trace(go.Scatter(x=close.index, y=close.values, mode='lines', name='Close Price', line=dict(color='gray')))
+        fig.add_trace(go.Scatter(x=sma_50.index, y=sma_50.values, mode='lines', name='50-Day SMA', line=dict(color='blue')))
+        fig.add_trace(go.Scatter(x=sma_200.index, y=sma_200.values, mode='lines', name='200-Day SMA', line=dict(color='red')))
+
+        # Update layout
+        fig.update_layout(
+            title='Simulated Stock Price with 50 & 200 Day Moving Averages (Interactive)',
+            xaxis_title='Date',
+            yaxis_title='Price (INR)',
+            legend=dict(x=0, y=1),
+            hovermode='x unified',
+            template='plotly_white',
+            height=600,
+            width=1000
+        )
+        return fig
+
     # Displaying the stock data    
     st.subheader(f"Stock Closing Price for {ticker} for Last for ({time})")
     st.write("This chart shows the closing price of the selected stock over the specified time period.")
-    fig = px.line(data, x='Date', y='Close', title=f"Closing Price of {ticker} for {time}")
-    fig.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white')
-    fig.update_layout(xaxis_title='Date', yaxis_title='Closing Price (INR)')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(cached_chart("close", close_chart), use_container_width=True)
 
     st.subheader(f"Stock Opening Price for {ticker} for Last for ({time})")
-    fig = px.line(data, x='Date', y='Open', title=f"Opening Price of {ticker} for {time}")
-    fig.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white' )
-    fig.update_traces(line=dict(color='green'))
-    fig.update_layout(xaxis_title='Date', yaxis_title='Opening Price (INR)')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(cached_chart("open", open_chart), use_container_width=True)
 
     # Candlestick Chart
-    fig = go.Figure(data=[go.Candlestick(x=data.index,
-                    open=data['Open'],
-                    high=data['High'],
-                    low=data['Low'],
-                    close=data['Close'])])
-
-    fig.update_layout(
-        title='Stock Price Candlestick Chart',
-        xaxis_title='Date',
-        yaxis_title='Price',
-        xaxis_rangeslider_visible=False
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(cached_chart("candlestick", candlestick_chart), use_container_width=True)
 
     # Moving Averages
     st.subheader(f"Moving Averages for {ticker} for Last for ({time})")
-    fig = go.Figure()
-
-    # Calculate 50-day and 200-day Simple Moving Averages (SMA)
-    # Adjust window size based on available data
-    data_length = len(data)
-    window_50 = min(50, data_length)
-    window_200 = min(200, data_length)
-
-    # Ensure the two SMAs use different window sizes; otherwise they overlap and look like one line
-    if window_50 == window_200 and window_200 > 1:
-        window_50 = max(1, window_200 // 2)
-
-    # Use min_periods=1 so SMA lines are visible even for short time ranges
-    data['SMA_50'] = data['Close'].rolling(window=window_50, min_periods=1).mean()
-    data['SMA_200'] = data['Close'].rolling(window=window_200, min_periods=1).mean()
-
-    # Use Date for x-axis to be consistent with other charts
-    fig.add_trace(go.Scatter(x=data['Date'], y=data['Close'], mode='lines', name='Close Price', line=dict(color='gray')))
-    fig.add_trace(go.Scatter(x=data['Date'], y=data['SMA_50'], mode='lines', name='50-Day SMA', line=dict(color='blue')))
-    fig.add_trace(go.Scatter(x=data['Date'], y=data['SMA_200'], mode='lines', name='200-Day SMA', line=dict(color='red')))
-
-    # Update layout
-    fig.update_layout(
-        title='Simulated Stock Price with 50 & 200 Day Moving Averages (Interactive)',
-        xaxis_title='Date',
-        yaxis_title='Price (INR)',
-        legend=dict(x=0, y=1),
-        hovermode='x unified',
-        template='plotly_white',
-        height=600,
-        width=1000
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(cached_chart("moving_averages", moving_average_chart), use_container_width=True)
 
     # Yearly Analysis
-    if time == "1y" or time == "2y" or time == "5y" or time == "8y" or time == "10y" or time == "max":
+    if time in LONG_PERIODS:
         st.subheader(f"Yearly Analysis for {ticker}")
-        data['Year']= data.Date.str.split("-").str[0]
-        data['Month'] = data.Date.str.split("-").str[1]
-        yearly_data = data.groupby('Year').agg({'Open': 'mean', 'High': 'max', 'Low': 'min', 'Close': 'mean', 'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'sum'})
-        yearly_data.reset_index(inplace=True)
+        # Materialized in the price store, so long periods are a lookup rather than a scan
+        yearly, monthly = load_rollups(ticker_symbol, time)
+        yearly_data = format_yearly(yearly)
 
         st.table(yearly_data)
-        bar = px.bar(yearly_data, x='Year', y='Dividends',  template='plotly_white' , title=f"Yearly Dividends for {ticker}")
-        bar.update_layout(title_x=0.5, title_font=dict(size=20), xaxis_title='Year', yaxis_title='Dividends (INR)')
-        st.plotly_chart(bar , use_container_width=True)
+
+        def dividends_chart():
+            bar = px.bar(yearly_data, x='Year', y='Dividends',  template='plotly_white' , title=f"Yearly Dividends for {ticker}")
+            bar.update_layout(title_x=0.5, title_font=dict(size=20), xaxis_title='Year', yaxis_title='Dividends (INR)')
+            return bar
+
+        def yearly_volume_chart():
+            fig = px.pie(yearly_data, values = 'Volume', names = 'Year')
+            fig.update_traces(textposition='outside', textinfo='percent+label')
+            return fig
+
+        st.plotly_chart(cached_chart("yearly_dividends", dividends_chart), use_container_width=True)
         
         st.subheader(f"Yearly Volume Distribution for {ticker}")
-        fig = px.pie(yearly_data, values = 'Volume', names = 'Year')
-        fig.update_traces(textposition='outside', textinfo='percent+label')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_chart("yearly_volume", yearly_volume_chart), use_container_width=True)
 
         
         st.subheader(f"Yearly Maximun Price Distribution for {ticker}")
-        st.plotly_chart(px.bar(yearly_data, x = 'Year', y = 'High' , color = 'High'))
+        st.plotly_chart(cached_chart("yearly_high", lambda: px.bar(yearly_data, x = 'Year', y = 'High' , color = 'High')))
 
     #monthly analysis
-    if time == "1y" or time == "2y" or time == "5y" or time == "8y" or time == "10y" or time == "max":
+    if time in LONG_PERIODS:
         st.subheader(f"Monthly Analysis for {ticker}")
-        year = st.selectbox("Select the Year ", data.Date.str.split("-").str[0].unique().tolist(), index=0)
+        year = st.selectbox("Select the Year ", yearly_data['Year'].tolist(), index=0)
 
-        monthly_data = data.groupby(['Year' , 'Month']).agg({'Open': 'mean', 'High': 'max', 'Low': 'min', 'Close': 'mean', 'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'sum'})
-        monthly_data.reset_index(inplace = True)
-        overall_monthly_data = monthly_data.copy()
-        monthly_data = monthly_data[monthly_data['Year'] == year]
+        monthly_data = format_monthly(monthly[monthly.index.year == int(year)])
         st.table(monthly_data)
 
-        line_plot = px.line()
-        line_plot.add_scatter(x=monthly_data['Month'], y=monthly_data['High'], mode='lines', name='High Price', line=dict(color='green') )
-        line_plot.add_scatter(x=monthly_data['Month'], y=monthly_data['Low'], mode='lines', name='Low Price', line=dict(color='red') )
-        line_plot.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white')
-        line_plot.update_layout(hovermode='x unified', height=600, width=1000 , title=f"Monthly Analysis for {ticker} in {year}")
-        line_plot.update_layout(xaxis_title='Month', yaxis_title='Closing Price (INR)')
-        st.plotly_chart(line_plot, use_container_width=True)
+        def monthly_chart():
+            line_plot = px.line()
+            line_plot.add_scatter(x=monthly_data['Month'], y=monthly_data['High'], mode='lines', name='High Price', line=dict(color='green') )
+            line_plot.add_scatter(x=monthly_data['Month'], y=monthly_data['Low'], mode='lines', name='Low Price', line=dict(color='red') )
+            line_plot.update_layout(title_x=0.5, title_font=dict(size=20), template='plotly_white')
+            line_plot.update_layout(hovermode='x unified', height=600, width=1000 , title=f"Monthly Analysis for {ticker} in {year}")
+            line_plot.update_layout(xaxis_title='Month', yaxis_title='Closing Price (INR)')
+            return line_plot
+
+        st.plotly_chart(cached_chart("monthly", monthly_chart, year), use_container_width=True)
 
     # Monthly Volume Distribution
         st.subheader(f"Monthly Volume Distribution for {ticker} in {year}")
-        monthly_volume = monthly_data.groupby('Month')['Volume'].sum().reset_index()
-        fig = px.pie(monthly_volume, values='Volume', names='Month', title=f"Monthly Volume Distribution for {ticker} in {year}")
-        st.plotly_chart(fig, use_container_width=True)
-
-        Over = overall_monthly_data.groupby(['Month' , 'Year'])['Volume'].sum().reset_index().sort_values(by='Volume', ascending=False)
+        monthly_volume_chart = lambda: px.pie(monthly_data, values='Volume', names='Month', title=f"Monthly Volume Distribution for {ticker} in {year}")
+        st.plotly_chart(cached_chart("monthly_volume", monthly_volume_chart, year), use_container_width=True)
 
     # Top 10 months with highest volume counts
-    if time == "1y" or time == "2y" or time == "5y" or time == "8y" or time == "10y" or time == "max":
+    if time in LONG_PERIODS:
         st.subheader("Top 10 Months with Highest Volume Counts")
-        max_volume_per_year = Over.loc[Over.groupby('Year')['Volume'].idxmax()]
-        max_volume_per_year = max_volume_per_year.sort_values(by='Year')
+        max_volume_per_year = format_monthly(top_volume_months(monthly)[['Volume']])
         # Display result
         max_volume_per_year['Date'] = max_volume_per_year['Month'] + "-" + max_volume_per_year['Year']
         st.table(max_volume_per_year)
 
-        barplot = px.bar(max_volume_per_year, x='Date', y='Volume', title=f"Monthly Volume Counts for {ticker}", template='plotly_white')
-        barplot.update_layout(title_x=0.5, title_font=dict(size=20), xaxis_title='Date', yaxis_title='Volume')
-        st.plotly_chart(barplot, use_container_width=True)
+        def top_months_chart():
+            barplot = px.bar(max_volume_per_year, x='Date', y='Volume', title=f"Monthly Volume Counts for {ticker}", template='plotly_white')
+            barplot.update_layout(title_x=0.5, title_font=dict(size=20), xaxis_title='Date', yaxis_title='Volume')
+            return barplot
+
+        st.plotly_chart(cached_chart("top_volume_months", top_months_chart), use_container_width=True)
 
     # Removed sidebar-based 3 Year Analysis and related sidebar usage
 
     if st.checkbox("Model Prediction", value=True):
         try:
-            model = joblib.load("linear_regression_model.pkl")
             st.header("Stock Price Prediction")
             st.write("This model predicts the stock price based on the historical data.")
+            model_type = st.radio("Model type", MODEL_TYPES, horizontal=True, format_func=str.capitalize,
+                                  help="Batch: the trained model. Online: updated with every new bar for this ticker.")
         
             if st.button("Predict"):
                 if len(data) < 5:
                     st.error("Prediction requires at least 5 days of data. Please select a longer time period (e.g., 5d, 1w, or 1mo).")
                 else:
-                    Price_yes = data['Close'].iloc[-1]  # Last day closing price
-                    Price_2day_before = data['Close'].iloc[-2]
-                    Price_3day_before = data['Close'].iloc[-3]
-                    Price_4day_before = data['Close'].iloc[-4]
-                    Price_5day_before = data['Close'].iloc[-5]
-
-                    new = pd.DataFrame({
-                        'Price_yes': [Price_yes],
-                        'Price_2day_before': [Price_2day_before],
-                        'Price_3day_before': [Price_3day_before],
-                        'Price_4day_before': [Price_4day_before],
-                        'Price_5day_before': [Price_5day_before]
-                    })
-                        
-                    prediction = model.predict(new)
-                    st.subheader(f"The predicted stock price for {ticker} is: {prediction[0]:.2f} INR")
+                    model = get_predictor(model_type, ticker_symbol)
+                    # Last five closing prices, most recent first
+                    lags = latest_lags(data['Close'].to_numpy(), 5)
+                    prediction = model.predict(lags, ticker_symbol)
+                    st.subheader(f"The predicted stock price for {ticker} is: {prediction:.2f} INR")
+                    st.caption(f"Model version: {model.version}")
 
                 st.write("-----------------------------------------------------------------------")
                 st.write("This prediction is based on the last 5 days of closing prices.")
@@ -345,3 +398,27 @@ def show_dashboard():
         except Exception as e:
             st.error(f"Prediction model not available: {str(e)}. Please install scikit-learn (pip install scikit-learn) to enable predictions.")
             st.info("You can still use other features of the dashboard.")
+
+    if st.checkbox("Forecast All Tickers", value=False):
+        st.header("Forecast for All Tickers")
+        st.write("Ranks tickers by the model's predicted move from their last stored close.")
+        universe = st.radio("Universe", ["Featured tickers", "All NSE symbols"], horizontal=True, key="forecast-universe")
+        index = get_symbol_index()
+        if universe == "Featured tickers":
+            symbols = list(nse_tickers.values())
+        else:
+            symbols = [symbol for _, symbol in index.entries]
+
+        if st.button("Update Prices", key="forecast-update"):
+            with st.spinner(f"Updating prices for {len(symbols)} tickers..."):
+                failed = update_prices(symbols)
+            if failed:
+                st.warning(f"Could not update {len(failed)} tickers.")
+
+        try:
+            forecasts = forecast_all(symbols, names={symbol: index.name_of(symbol) for symbol in symbols})
+        except Exception as e:
+            st.error(f"Forecast not available: {str(e)}")
+        else:
+            st.caption(f"{len(forecasts)} of {len(symbols)} tickers have at least 5 stored closing prices.")
+            st.dataframe(forecasts, use_container_width=True, hide_index=True)
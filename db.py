@@ -0,0 +1,159 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Access layer for users.db, shared by auth and the game. Connections are kept
+# open in a process-wide pool and lent out per call or transaction (Streamlit runs
+# every rerun on a new thread, so per-thread connections would be rebuilt on each
+# one, losing their prepared statement caches). The database runs in WAL mode so
+# readers don't block the writer, and the schema is created once per process.
+DB_PATH = 'users.db'
+
+# Prepared statements kept per connection
+CACHED_STATEMENTS = 256
+
+# Idle connections kept open; a burst beyond this opens extra ones that are closed after use
+POOL_SIZE = 8
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    # Durable at checkpoints; a power loss can drop the last commits but never corrupts
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+)
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS users
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        created_at TEXT NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS game_scores
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        score REAL NOT NULL,
+        date TEXT NOT NULL)''',
+    # Logged-out session tokens, kept until the token would have expired (see sessions.py)
+    '''CREATE TABLE IF NOT EXISTS revoked_sessions
+       (sid TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL) WITHOUT ROWID''',
+    # One-time nonces (SHA-256) that restore a remembered session from the URL (see sessions.py)
+    '''CREATE TABLE IF NOT EXISTS session_nonces
+       (nonce TEXT PRIMARY KEY,
+        token TEXT NOT NULL,
+        expires_at REAL NOT NULL) WITHOUT ROWID''',
+    # Each user's best score per leaderboard period ('all', 'week', 'day') and bucket
+    # (the Monday of the week, the day), maintained by game.save_game_score
+    '''CREATE TABLE IF NOT EXISTS best_scores
+       (period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        user_email TEXT NOT NULL,
+        score REAL NOT NULL,
+        date TEXT NOT NULL,
+        PRIMARY KEY (period, bucket, user_email)) WITHOUT ROWID''',
+    # Covers the top-N query: the primary key columns ride along in the index
+    '''CREATE INDEX IF NOT EXISTS idx_best_scores_rank ON best_scores (period, bucket, score DESC)''',
+    # Fill best_scores from scores saved before it existed
+    '''INSERT INTO best_scores (period, bucket, user_email, score, date)
+       SELECT 'all', '', user_email, MAX(score), date FROM game_scores
+        WHERE NOT EXISTS (SELECT 1 FROM best_scores) GROUP BY user_email
+       UNION ALL
+       SELECT 'week', date(date, 'weekday 0', '-6 days'), user_email, MAX(score), date FROM game_scores
+        WHERE NOT EXISTS (SELECT 1 FROM best_scores) GROUP BY 2, user_email
+       UNION ALL
+       SELECT 'day', date(date), user_email, MAX(score), date FROM game_scores
+        WHERE NOT EXISTS (SELECT 1 FROM best_scores) GROUP BY 2, user_email''',
+    # Append-only log of game state changes and the latest snapshot per user (see trade_journal.py)
+    '''CREATE TABLE IF NOT EXISTS game_journal
+       (id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at TEXT NOT NULL)''',
+    '''CREATE INDEX IF NOT EXISTS idx_game_journal_user ON game_journal (user_id, id)''',
+    '''CREATE TABLE IF NOT EXISTS game_snapshots
+       (user_id TEXT PRIMARY KEY,
+        journal_id INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        created_at TEXT NOT NULL)''',
+)
+
+_pool = queue.LifoQueue()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _schema_ready = True
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None, check_same_thread=False,
+                           cached_statements=CACHED_STATEMENTS)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if not _schema_ready:
+        _ensure_schema(conn)
+    return conn
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection to users.db for a block of reads (autocommit; use transaction() for writes)"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if _pool.qsize() < POOL_SIZE:
+            _pool.put(conn)
+        else:
+            conn.close()
+
+
+@contextmanager
+def transaction():
+    """Run a block of writes atomically on a pooled connection.
+
+    The write lock is taken up front (BEGIN IMMEDIATE), so concurrent writers wait
+    for each other via busy_timeout instead of failing with "database is locked"
+    when a read transaction tries to upgrade.
+    """
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def close():
+    """Close the idle pooled connections (new ones are opened on next use)"""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
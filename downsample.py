@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+# Server-side downsampling so charts send a bounded number of points to the browser
+# no matter how long the history is.
+
+# Target points per chart
+LINE_POINTS = 1000
+CANDLE_POINTS = 300
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of the n_out points that best keep the shape of y(x)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket (or the last point) is the third triangle corner
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x) * (y[start:end] - py) - (px - x[start:end]) * (next_y - py))
+        previous = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_series(series, n_out=LINE_POINTS):
+    """LTTB-downsample a Series indexed by dates (or numbers)"""
+    if len(series) <= n_out:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index, dtype=float)
+    values = series.to_numpy(dtype=float)
+    # LTTB needs finite values; NaNs (e.g. the warm-up of an indicator) draw nothing anyway
+    valid = np.flatnonzero(np.isfinite(values))
+    if len(valid) <= n_out:
+        return series.iloc[valid]
+    keep = valid[lttb_indices(x[valid], values[valid], n_out)]
+    return series.iloc[keep]
+
+
+def downsample_ohlc(data, n_out=CANDLE_POINTS):
+    """Aggregate consecutive bars into n_out OHLC candles (first open, max high, min low, last close)"""
+    if len(data) <= n_out:
+        return data
+    starts = np.linspace(0, len(data), n_out, endpoint=False).astype(int)
+    ends = np.append(starts[1:], len(data)) - 1
+    candles = pd.DataFrame({
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+    }, index=data.index[starts])
+    if 'Volume' in data.columns:
+        candles['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return candles
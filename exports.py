@@ -0,0 +1,157 @@
+import argparse
+import io
+import itertools
+import zipfile
+import pandas as pd
+import price_store
+from price_store import PRICE_COLUMNS
+
+# Data exports, built only when someone asks for them. Parquet and Arrow IPC need
+# pyarrow; without it only CSV is offered.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Format name -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Rows read from the price store per chunk for bulk exports
+CHUNK_ROWS = 50_000
+
+
+def available_formats():
+    return [name for name in FORMATS if name == "CSV" or pa is not None]
+
+
+def file_name(stem, fmt):
+    return f"{stem}.{FORMATS[fmt][0]}"
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
+
+
+def _table(frame):
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def export_frame(frame, fmt):
+    """Serialize a frame (without its index) to bytes in the given format"""
+    if fmt == "CSV":
+        return frame.to_csv(index=False).encode('utf-8')
+    if pa is None:
+        raise ValueError(f"{fmt} export needs pyarrow")
+    buffer = io.BytesIO()
+    if fmt == "Parquet":
+        pq.write_table(_table(frame), buffer)
+    elif fmt == "Arrow":
+        table = _table(frame)
+        with pa.ipc.new_file(buffer, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
+
+
+def export_history(data, fmt):
+    """Serialize a price frame indexed by date; CSV gets YYYY-MM-DD dates, the binary formats timestamps"""
+    if fmt == "CSV":
+        table = data.reset_index(drop=True)
+        table.insert(0, 'Date', data.index.strftime('%Y-%m-%d'))
+    else:
+        table = data.reset_index()
+    return export_frame(table, fmt)
+
+
+def iter_history_chunks(ticker_symbol, period="max", chunk_rows=CHUNK_ROWS):
+    """Yield a ticker's stored bars as frames of at most chunk_rows rows, oldest first"""
+    start = price_store.period_start(period) or ""
+    conn = price_store.connect()
+    try:
+        query = ("SELECT date, open, high, low, close, volume, dividends, stock_splits FROM prices "
+                 "WHERE ticker = ? AND date >= ? ORDER BY date")
+        for chunk in pd.read_sql_query(query, conn, params=(ticker_symbol, start), chunksize=chunk_rows):
+            chunk.columns = ['Date'] + PRICE_COLUMNS
+            yield chunk
+    finally:
+        conn.close()
+
+
+def _write_member(out, chunks, fmt):
+    """Write chunks into an open (non-seekable) zip member one at a time"""
+    if fmt == "CSV":
+        for i, chunk in enumerate(chunks):
+            out.write(chunk.to_csv(index=False, header=i == 0).encode('utf-8'))
+        return
+    writer = None
+    try:
+        for chunk in chunks:
+            chunk['Date'] = pd.to_datetime(chunk['Date'])
+            table = _table(chunk)
+            if writer is None:
+                if fmt == "Parquet":
+                    writer = pq.ParquetWriter(out, table.schema)
+                else:
+                    writer = pa.ipc.new_file(out, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_bundle(target, tickers, period="max", fmt="CSV", chunk_rows=CHUNK_ROWS):
+    """Write a zip with one file per ticker to `target` (a path or binary file object).
+
+    Each ticker is streamed from the price store chunk by chunk, so memory use is
+    bounded by chunk_rows rather than by the size of the export. Only stored bars
+    are exported; tickers without any are skipped. Returns the tickers written.
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"{fmt} export is not available")
+    written = []
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for ticker_symbol in tickers:
+            chunks = iter_history_chunks(ticker_symbol, period, chunk_rows)
+            first = next(chunks, None)
+            if first is None or first.empty:
+                continue
+            with bundle.open(file_name(ticker_symbol, fmt), "w", force_zip64=True) as out:
+                _write_member(out, itertools.chain([first], chunks), fmt)
+            written.append(ticker_symbol)
+    return written
+
+
+def bundle_bytes(tickers, period="max", fmt="CSV"):
+    """Build a bundle in memory for st.download_button, which needs the whole file.
+
+    Only the compressed zip is held; the source bars are still read in chunks.
+    """
+    buffer = io.BytesIO()
+    write_bundle(buffer, tickers, period, fmt)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export stored price histories as a zip bundle")
+    parser.add_argument("output", help="Zip file to write")
+    parser.add_argument("symbols", nargs="*", help="Symbols to export (default: the dashboard universe)")
+    parser.add_argument("--period", default="max")
+    parser.add_argument("--format", default="CSV", choices=list(FORMATS))
+    parser.add_argument("--update", action="store_true", help="Update the store from the provider first")
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        from symbols import nse_tickers
+        symbols = list(nse_tickers.values())
+    if args.update:
+        for symbol in symbols:
+            price_store.get_history(symbol, args.period)
+    written = write_bundle(args.output, symbols, args.period, args.format)
+    print(f"Exported {len(written)} of {len(symbols)} tickers to {args.output}")
@@ -0,0 +1,63 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Model features built from price arrays without Python loops. Inputs are 1-D
+# (days) or 2-D (tickers x days) arrays; windows and lag matrices are strided
+# views into the input, so no data is copied until a caller needs to.
+
+
+def windows(values, window):
+    """Every run of `window` consecutive values, oldest first: shape (..., days - window + 1, window)"""
+    return sliding_window_view(np.asarray(values), window, axis=-1)
+
+
+def lag_matrix(values, lags=5):
+    """Lag features for every day with enough history, most recent first.
+
+    Row i holds values[i + lags - 1], values[i + lags - 2], ..., values[i], i.e. the
+    Price_yes ... Price_5day_before columns the price model expects.
+    """
+    return windows(values, lags)[..., ::-1]
+
+
+def latest_lags(values, lags=5):
+    """The last `lags` values, most recent first"""
+    values = np.asarray(values)
+    if values.shape[-1] < lags:
+        raise ValueError(f"Need at least {lags} values, got {values.shape[-1]}")
+    return values[..., :-lags - 1:-1]
+
+
+def training_windows(values, window):
+    """(inputs, targets) where each input is `window` values and the target is the next value"""
+    values = np.asarray(values)
+    return windows(values[..., :-1], window), values[..., window:]
+
+
+def lag_training_set(values, lags=5):
+    """(lag matrix, next value) pairs for fitting the lag model"""
+    values = np.asarray(values)
+    return lag_matrix(values[..., :-1], lags), values[..., lags:]
+
+
+def returns(values, log=False):
+    """Day-over-day returns; one element shorter than the input along the last axis"""
+    values = np.asarray(values, dtype=float)
+    if log:
+        return np.diff(np.log(values), axis=-1)
+    return values[..., 1:] / values[..., :-1] - 1
+
+
+def normalize_lags(lags):
+    """Lag features relative to the most recent one (first column), so tickers of any price level compare"""
+    lags = np.asarray(lags, dtype=float)
+    return lags / lags[..., :1] - 1
+
+
+def minmax_scale(values, axis=-1):
+    """Scale values to [0, 1] along an axis (per window when given windows)"""
+    values = np.asarray(values, dtype=float)
+    low = values.min(axis=axis, keepdims=True)
+    span = values.max(axis=axis, keepdims=True) - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(span > 0, (values - low) / span, 0.0)
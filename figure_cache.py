@@ -0,0 +1,33 @@
+import hashlib
+import numpy as np
+from shared_cache import TTLCache
+
+# Built Plotly figures shared by every session. A rerun that doesn't change the
+# underlying data (a button click, a checkbox) reuses the figures instead of
+# rebuilding them.
+_figures = TTLCache(maxsize=512, ttl=3600)
+
+
+# Columns the charts plot; older bars are re-adjusted after a dividend or split, so all of them are hashed
+PLOTTED_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def data_version(data):
+    """Digest of a price frame's dates and plotted columns: changes whenever any bar is added or revised"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(data.index.asi8))
+    digest.update(np.ascontiguousarray(data.reindex(columns=PLOTTED_COLUMNS).to_numpy(dtype=float)))
+    return digest.hexdigest()
+
+
+def get_figure(key, build):
+    """Return the cached figure for key, building it with build() on a miss.
+
+    Keys should look like (ticker, period, data version, chart type, ...) with
+    any extra inputs the figure depends on (zoom range, selected year).
+    """
+    return _figures.get_or_load(key, build)
+
+
+def stats():
+    return _figures.stats()
@@ -0,0 +1,95 @@
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import price_store
+from model_registry import FEATURES, get_model
+
+# Next-close forecasts for a whole universe of tickers at once: one query builds
+# the tickers x lags feature matrix from the price store and one matrix product
+# scores it.
+LAGS = len(FEATURES)
+
+
+def lag_matrix(tickers, lags=LAGS):
+    """Return (symbols, last dates, tickers x lags matrix of closes, most recent first).
+
+    Tickers with fewer than `lags` stored bars are left out.
+    """
+    conn = price_store.connect()
+    try:
+        # For each wanted ticker, the lags-th latest date bounds a primary key range
+        # scan, so the cost is proportional to the number of tickers, not bars.
+        rows = conn.execute('''WITH wanted(ticker) AS (SELECT DISTINCT value FROM json_each(?))
+                               SELECT p.ticker, p.date, p.close FROM wanted
+                               JOIN prices p ON p.ticker = wanted.ticker
+                               AND p.date >= (SELECT date FROM prices WHERE ticker = wanted.ticker
+                                              ORDER BY date DESC LIMIT 1 OFFSET ?)
+                               ORDER BY p.ticker, p.date DESC''',
+                            (json.dumps(list(tickers)), lags - 1)).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return [], [], np.empty((0, lags))
+    symbols, dates, closes = zip(*rows)
+    closes = np.array(closes, dtype=float).reshape(-1, lags)
+    return list(symbols[::lags]), list(dates[::lags]), closes
+
+
+def forecast_all(tickers, names=None):
+    """Rank tickers by the model's predicted move from their last stored close"""
+    symbols, dates, lags = lag_matrix(tickers)
+    columns = ['Symbol', 'Name', 'Date', 'Last Close', 'Predicted', 'Change', 'Change %']
+    if not symbols:
+        return pd.DataFrame(columns=columns)
+    predicted = get_model().predict(lags, symbols)
+    last_close = lags[:, 0]
+    names = names or {}
+    table = pd.DataFrame({
+        'Symbol': symbols,
+        'Name': [names.get(symbol, symbol) for symbol in symbols],
+        'Date': dates,
+        'Last Close': last_close,
+        'Predicted': predicted,
+        'Change': predicted - last_close,
+        'Change %': (predicted / last_close - 1) * 100,
+    }, columns=columns)
+    # Rows with missing closes can't be ranked
+    table = table[np.isfinite(table['Change %'])]
+    return table.sort_values('Change %', ascending=False, ignore_index=True)
+
+
+def update_prices(tickers, period="1mo", max_workers=8):
+    """Bring the store up to date for many tickers; returns the tickers that failed"""
+    def update(symbol):
+        try:
+            price_store.update_history(symbol, period)
+            return None
+        except Exception as e:
+            print(f"Price store update failed for {symbol}: {e}")
+            return symbol
+
+    price_store.init_price_db()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [symbol for symbol in pool.map(update, tickers) if symbol is not None]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast the next close for many tickers")
+    parser.add_argument("symbols", nargs="*", help="Symbols to forecast (default: the dashboard universe)")
+    parser.add_argument("--all", action="store_true", help="Use every NSE symbol in the symbol master")
+    parser.add_argument("--update", action="store_true", help="Update the price store first")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    from symbols import nse_tickers, get_symbol_index
+    index = get_symbol_index()
+    if args.all:
+        symbols = [symbol for _, symbol in index.entries]
+    else:
+        symbols = args.symbols or list(nse_tickers.values())
+    if args.update:
+        update_prices(symbols)
+    table = forecast_all(symbols, names={symbol: index.name_of(symbol) for symbol in symbols})
+    print(table.head(args.top).to_string(index=False))
@@ -0,0 +1,130 @@
+import argparse
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import price_store
+from market_data import get_provider
+from shared_cache import shared_cache
+
+# Ticker fundamentals, refreshed at most once a day per ticker. Only the fields the
+# dashboard displays are kept; the full .info payload is large and slow to fetch.
+FIELDS = (
+    'longName',
+    'sector',
+    'industry',
+    'currentPrice',
+    'previousClose',
+    'fiftyDayAverage',
+    'twoHundredDayAverage',
+    'marketCap',
+    'fiftyTwoWeekLow',
+    'fiftyTwoWeekHigh',
+    'trailingPE',
+    'dividendYield',
+    'averageVolume',
+)
+
+_initialized = False
+
+
+def _connect():
+    return sqlite3.connect(price_store.DB_PATH, timeout=30)
+
+
+def init_fundamentals_db():
+    """Initialize the fundamentals table (once per process)"""
+    global _initialized
+    if _initialized:
+        return
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS fundamentals
+                 (ticker TEXT PRIMARY KEY,
+                  fetched_on TEXT NOT NULL,
+                  data TEXT NOT NULL)''')
+    conn.commit()
+    conn.close()
+    _initialized = True
+
+
+def project(info):
+    """Keep only the displayed fields of a .info payload"""
+    return {field: info.get(field) for field in FIELDS}
+
+
+def _load(ticker_symbol):
+    conn = _connect()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT fetched_on, data FROM fundamentals WHERE ticker = ?", (ticker_symbol,))
+        row = c.fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None, None
+    return row[0], json.loads(row[1])
+
+
+def _save(ticker_symbol, fields):
+    conn = _connect()
+    try:
+        conn.execute("INSERT OR REPLACE INTO fundamentals (ticker, fetched_on, data) VALUES (?, ?, ?)",
+                     (ticker_symbol, datetime.now().strftime('%Y-%m-%d'), json.dumps(fields, default=str)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def refresh_fundamentals(ticker_symbol, force=False):
+    """Fetch and store a ticker's fundamentals unless they were already fetched today"""
+    init_fundamentals_db()
+    fetched_on, fields = _load(ticker_symbol)
+    if not force and fetched_on == datetime.now().strftime('%Y-%m-%d'):
+        return fields
+    try:
+        fields = project(get_provider().info(ticker_symbol))
+    except Exception as e:
+        if fields is None:
+            raise
+        # Keep serving yesterday's values if the provider is unreachable
+        print(f"Fundamentals refresh failed for {ticker_symbol}: {e}")
+        return fields
+    _save(ticker_symbol, fields)
+    return fields
+
+
+@shared_cache(ttl=600, maxsize=4096)
+def get_fundamentals(ticker_symbol):
+    """Return the stored fundamentals of a ticker, fetching them if they are missing or stale"""
+    return refresh_fundamentals(ticker_symbol)
+
+
+def refresh_all(symbols, max_workers=4, force=False):
+    """Bulk refresh job for a whole universe; returns the symbols that failed"""
+    def refresh(symbol):
+        try:
+            refresh_fundamentals(symbol, force=force)
+            return None
+        except Exception as e:
+            print(f"Failed to refresh {symbol}: {e}")
+            return symbol
+
+    init_fundamentals_db()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [symbol for symbol in pool.map(refresh, symbols) if symbol is not None]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh stored ticker fundamentals")
+    parser.add_argument("symbols", nargs="*", help="Symbols to refresh (default: the dashboard universe)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="Refetch even if already fetched today")
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        from symbols import nse_tickers
+        symbols = list(nse_tickers.values())
+    failed = refresh_all(symbols, max_workers=args.workers, force=args.force)
+    print(f"Refreshed {len(symbols) - len(failed)} of {len(symbols)} tickers")
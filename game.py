@@ -1,48 +1,93 @@
 import streamlit as st
-import yfinance as yf
 import random
 import pandas as pd
 from datetime import datetime, timedelta
-import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
 import re
 import json
+import threading
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
-from dashboard_fixed import nse_tickers
+from db import connection, transaction
+from dashboard_fixed import nse_tickers, select_ticker
+from price_store import get_history
+from quotes import get_quotes
+from downsample import downsample_series, downsample_ohlc
+from indicators import engine as indicator_engine
+from symbols import get_symbol_index
+import refresher
+import trade_journal
 
 load_dotenv()
 
+# Symbols outside the featured universe that players picked or hold; the refresher
+# quotes them along with the featured tickers
+_watched_symbols = set()
+_watched_lock = threading.Lock()
+
+def _game_quotes():
+    with _watched_lock:
+        watched = sorted(_watched_symbols)
+    return get_quotes(list(nse_tickers.values()) + watched)
+
+# Live quotes for the game universe are kept fresh by the background refresher
+refresher.register("nse_prices", _game_quotes, interval=60)
+
+def watch_symbol(symbol):
+    """Have the refresher quote a symbol from its next pass on"""
+    with _watched_lock:
+        if symbol in _watched_symbols:
+            return
+        _watched_symbols.add(symbol)
+    refresher.refresh_now("nse_prices")
+
 # Game database functions
-def init_game_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS game_scores
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  user_email TEXT NOT NULL,
-                  score REAL NOT NULL,
-                  date TEXT NOT NULL)''')
-    conn.commit()
-    conn.close()
+# Leaderboard windows: the best_scores bucket a score made at `now` falls in
+LEADERBOARD_WINDOWS = {
+    'all': lambda now: '',
+    'week': lambda now: (now.date() - timedelta(days=now.weekday())).isoformat(),  # Monday of the week
+    'day': lambda now: now.date().isoformat(),
+}
+LEADERBOARD_SIZE = 10
+
+# window -> (bucket, top rows); dropped only when a new score could enter the top rows
+_leaderboards = {}
+_leaderboard_lock = threading.Lock()
 
 def save_game_score(user_id, score):
-    init_game_db()  # Ensure table exists
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("INSERT INTO game_scores (user_email, score, date) VALUES (?, ?, ?)",
-              (user_id, score, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-    conn.commit()
-    conn.close()
-
-def get_leaderboard():
-    init_game_db()  # Ensure table exists
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT user_email, MAX(score) as max_score FROM game_scores GROUP BY user_email ORDER BY max_score DESC LIMIT 10")
-    results = c.fetchall()
-    conn.close()
-    return results
+    now = datetime.now()
+    with transaction() as conn:
+        conn.execute("INSERT INTO game_scores (user_email, score, date) VALUES (?, ?, ?)",
+                     (user_id, score, now.strftime('%Y-%m-%d %H:%M:%S')))
+        # Keep each user's best score per window up to date instead of aggregating game_scores on read
+        conn.executemany('''INSERT INTO best_scores (period, bucket, user_email, score, date) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(period, bucket, user_email) DO UPDATE SET score = excluded.score, date = excluded.date
+                            WHERE excluded.score > best_scores.score''',
+                         [(window, bucket(now), user_id, score, now.strftime('%Y-%m-%d %H:%M:%S'))
+                          for window, bucket in LEADERBOARD_WINDOWS.items()])
+    with _leaderboard_lock:
+        for window, bucket in LEADERBOARD_WINDOWS.items():
+            cached = _leaderboards.get(window)
+            if cached is None or cached[0] != bucket(now):
+                continue
+            rows = cached[1]
+            if len(rows) < LEADERBOARD_SIZE or score >= rows[-1][1]:
+                del _leaderboards[window]
+
+def get_leaderboard(window='all'):
+    """Top scores per user for a window ('all', 'week' or 'day'), cached until a score beats the cutoff"""
+    bucket = LEADERBOARD_WINDOWS[window](datetime.now())
+    cached = _leaderboards.get(window)
+    if cached is not None and cached[0] == bucket:
+        return cached[1]
+    with _leaderboard_lock:
+        with connection() as conn:
+            rows = conn.execute(
+                "SELECT user_email, score FROM best_scores WHERE period = ? AND bucket = ? ORDER BY score DESC, user_email LIMIT ?",
+                (window, bucket, LEADERBOARD_SIZE)).fetchall()
+        _leaderboards[window] = (bucket, rows)
+    return rows
 
 def generate_recommendation(scenario, stocks, nse_tickers):
     """Generate trading recommendation based on scenario using chatbot"""
@@ -243,6 +288,25 @@ def show_game():
     stocks = {ticker: name for name, ticker in nse_tickers.items()}
     stock_names = nse_tickers  # For reverse lookup
 
+    # Pick up the player's saved game on the first run of the session, and again
+    # whenever someone else logs in, so nobody plays on (and journals) another's game
+    player_id = st.session_state.get('user_id')
+    if st.session_state.get(trade_journal.PLAYER_KEY) != player_id:
+        trade_journal.clear(st.session_state)
+        st.session_state[trade_journal.PLAYER_KEY] = player_id
+        saved_game = trade_journal.restore(player_id) if player_id else None
+        if saved_game:
+            st.session_state.update(saved_game)
+
+    def journal(*fields):
+        """Persist the current values of game state fields"""
+        if player_id:
+            trade_journal.record_changes(player_id, st.session_state, *fields)
+
+    def journal_trade(trade_record):
+        if player_id:
+            trade_journal.record_trade(player_id, st.session_state, trade_record)
+
     # Initialize game state
     if 'portfolio' not in st.session_state:
         st.session_state.portfolio = {}
@@ -286,49 +350,69 @@ def show_game():
         st.session_state.scenario_end_value = None
 
     # Fetch real prices
-    @st.cache_data(ttl=300)  # Cache for 5 min
     def get_prices():
-        prices = {}
-        for symbol in stocks:
-            try:
-                data = yf.Ticker(symbol).history(period="1d")
-                prices[symbol] = data['Close'].iloc[-1] if not data.empty else 1000
-            except:
-                prices[symbol] = 1000
-        return prices
+        # Last good snapshot from the refresher, without waiting: show_game runs on every
+        # rerun of every tab, so a cold start shows the loading state instead of
+        # stalling the page. Symbols without a quote are left out.
+        quotes, age = refresher.get_snapshot("nse_prices")
+        if quotes is None:
+            return {}, None
+        return quotes['Close'].dropna().to_dict(), age
     
     @st.cache_data(ttl=300)  # Cache for 5 min
     def get_historical_data(ticker_symbol, period="3mo"):
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            data = ticker.history(period=period, auto_adjust=True)
-            data.reset_index(inplace=True)
-            if 'Date' in data.columns:
-                data['Date'] = data['Date'].astype(str)
-                data['Date'] = data['Date'].str.split(" ").str[0]
-            return data
+            return get_history(ticker_symbol, period)
         except:
             return pd.DataFrame()
 
-    prices = get_prices()
+    prices, prices_age = get_prices()
+    if prices_age is None:
+        st.caption("Live prices are still loading; trading opens once they arrive.")
+        st.button("Check for prices", key="game_check_prices")
+    else:
+        st.caption(f"Prices updated {int(prices_age)}s ago")
 
     # Apply scenario impact
     if st.session_state.scenario_active and st.session_state.scenario:
         for stock, impact in st.session_state.scenario['impacts'].items():
-            prices[stock] *= (1 + impact)
+            if stock in prices:
+                prices[stock] *= (1 + impact)
+
+    def price_of(symbol):
+        """Live price of a symbol, or None until the refresher has quoted it"""
+        # Stocks picked through search are quoted from the refresher's next pass
+        if symbol not in prices:
+            watch_symbol(symbol)
+        return prices.get(symbol)
+
+    def holding_price(symbol):
+        # A holding without a live quote is valued at the price it last traded at
+        price = price_of(symbol)
+        if price is None:
+            price = next((trade['price'] for trade in reversed(st.session_state.trades) if trade['stock'] == symbol), 0)
+        return price
+
+    # Holdings may include stocks outside the featured universe
+    for symbol in st.session_state.portfolio:
+        if symbol not in stocks:
+            stocks[symbol] = get_symbol_index().name_of(symbol)
 
     # Calculate portfolio value
-    portfolio_value = sum(st.session_state.portfolio.get(stock, 0) * prices[stock] for stock in stocks)
+    portfolio_value = sum(shares * holding_price(stock) for stock, shares in st.session_state.portfolio.items())
     total_value = st.session_state.cash + portfolio_value
     roi = ((total_value - 1000000) / 1000000) * 100
 
     # Update challenges
     if len(st.session_state.trades) >= 1 and not st.session_state.challenges["Beginner"]["completed"]:
         st.session_state.challenges["Beginner"]["completed"] = True
+        journal('challenges')
     if roi >= 5 and not st.session_state.challenges["Profit Seeker"]["completed"]:
         st.session_state.challenges["Profit Seeker"]["completed"] = True
+        journal('challenges')
     if len(st.session_state.trades) >= 10 and not st.session_state.challenges["Trader"]["completed"]:
         st.session_state.challenges["Trader"]["completed"] = True
+        journal('challenges')
 
     # UI Layout
     col1, col2 = st.columns([2, 1])
@@ -346,25 +430,30 @@ def show_game():
             st.info(tutorials[st.session_state.tutorial_step])
             if st.button("Next Tip"):
                 st.session_state.tutorial_step += 1
+                journal('tutorial_step')
                 st.rerun()
 
         # Trading Interface
         st.subheader("💼 Trading")
         with st.container():
-            stock_symbol = st.selectbox("Select Stock", list(stocks.keys()), format_func=lambda x: f"{x} - {stocks[x]}")
-            stock_name = stocks[stock_symbol]
+            stock_name, stock_symbol = select_ticker("Select Stock", key="game_stock")
+            stocks[stock_symbol] = stock_name
             action = st.selectbox("Action", ["Buy", "Sell"])
             shares = st.number_input("Shares", min_value=1, step=1)
-            current_price = prices[stock_symbol]
-            cost = shares * current_price * 1.005  # 0.5% fee
-
-            col_a, col_b = st.columns(2)
-            with col_a:
-                st.metric("Current Price", f"₹{current_price:.2f}")
-            with col_b:
-                st.metric("Total Cost", f"₹{cost:.2f}" if action == "Buy" else f"₹{shares * current_price * 0.995:.2f}")
+            current_price = price_of(stock_symbol)
+            quoted = current_price is not None
+
+            if quoted:
+                cost = shares * current_price * 1.005  # 0.5% fee
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.metric("Current Price", f"₹{current_price:.2f}")
+                with col_b:
+                    st.metric("Total Cost", f"₹{cost:.2f}" if action == "Buy" else f"₹{shares * current_price * 0.995:.2f}")
+            else:
+                st.warning(f"No live quote for {stock_name} yet, so it can't be traded right now.")
 
-            if st.button("Execute Trade"):
+            if st.button("Execute Trade", disabled=not quoted):
                 if action == "Buy":
                     if st.session_state.cash >= cost:
                         st.session_state.portfolio[stock_symbol] = st.session_state.portfolio.get(stock_symbol, 0) + shares
@@ -374,6 +463,7 @@ def show_game():
                         # Track trade during scenario
                         if st.session_state.scenario_active:
                             st.session_state.scenario_trades.append(trade_record)
+                        journal_trade(trade_record)
                         st.success(f"Bought {shares} shares of {stock_name}!")
                     else:
                         st.error("Not enough cash.")
@@ -386,6 +476,7 @@ def show_game():
                         # Track trade during scenario
                         if st.session_state.scenario_active:
                             st.session_state.scenario_trades.append(trade_record)
+                        journal_trade(trade_record)
                         st.success(f"Sold {shares} shares of {stock_name}!")
                     else:
                         st.error("Not enough shares.")
@@ -406,14 +497,15 @@ def show_game():
                 scenario_impact = st.session_state.scenario.get('impacts', {}).get(chart_stock)
             
             # Closing Price Chart
-            fig_close = px.line(chart_data, x='Date', y='Close', title=f"Closing Price of {stocks[chart_stock]} (Last 3 Months)")
+            close = downsample_series(chart_data['Close'])
+            fig_close = px.line(x=close.index, y=close.values, title=f"Closing Price of {stocks[chart_stock]} (Last 3 Months)")
             fig_close.update_layout(title_x=0.5, title_font=dict(size=16), template='plotly_white')
             fig_close.update_layout(xaxis_title='Date', yaxis_title='Closing Price (₹)')
             
             # Add scenario impact visualization if active
             if scenario_impact is not None:
                 last_idx = len(chart_data) - 1
-                last_date = chart_data['Date'].iloc[last_idx]
+                last_date = chart_data.index[last_idx]
                 last_close = chart_data['Close'].iloc[last_idx]
                 scenario_close = last_close * (1 + scenario_impact)
                 
@@ -456,6 +548,10 @@ def show_game():
                 fig_close.update_layout(
                     title=f"Closing Price of {stocks[chart_stock]} (Last 3 Months) - Scenario Active! ⚠️"
                 )
+
+            sma_20 = downsample_series(pd.Series(
+                indicator_engine.series(chart_stock, chart_data, "sma", window=20, min_periods=1), index=chart_data.index))
+            fig_close.add_scatter(x=sma_20.index, y=sma_20.values, mode='lines', name='20-Day SMA', line=dict(color='orange', width=1))
             
             st.plotly_chart(fig_close, use_container_width=True)
             
@@ -469,8 +565,9 @@ def show_game():
                 candlestick_data.loc[last_idx, 'High'] *= (1 + scenario_impact)
                 candlestick_data.loc[last_idx, 'Low'] *= (1 + scenario_impact)
             
+            candlestick_data = downsample_ohlc(candlestick_data)
             fig_candle = go.Figure(data=[go.Candlestick(
-                x=candlestick_data['Date'] if 'Date' in candlestick_data.columns else candlestick_data.index,
+                x=candlestick_data.index,
                 open=candlestick_data['Open'],
                 high=candlestick_data['High'],
                 low=candlestick_data['Low'],
@@ -504,6 +601,8 @@ def show_game():
                     st.session_state.scenario_start_value = total_value  # Record start value
                     st.session_state.recommendation_purchased = False  # Reset recommendation
                     st.session_state.recommendation_text = None
+                    journal('scenario', 'scenario_active', 'scenario_trades', 'scenario_start_value',
+                            'recommendation_purchased', 'recommendation_text')
                     st.rerun()
         else:
             st.warning(f"⚠️ {st.session_state.scenario['text']}")
@@ -537,6 +636,7 @@ def show_game():
                             st.session_state.recommendation_text = recommendation
                             st.session_state.recommendation_purchased = True
                             st.session_state.credits -= 1
+                            journal('recommendation_text', 'recommendation_purchased', 'credits')
                             st.rerun()
                 else:
                     st.warning("💰 **Not enough credits!** Purchase credits from the Portfolio section to get AI-powered trading recommendations.")
@@ -567,6 +667,8 @@ def show_game():
                 st.session_state.show_feedback = True  # Flag to show feedback
                 st.session_state.recommendation_purchased = False  # Reset for next scenario
                 st.session_state.recommendation_text = None
+                journal('challenges', 'scenario_end_value', 'last_scenario', 'scenario_active', 'scenario',
+                        'show_feedback', 'recommendation_purchased', 'recommendation_text')
                 st.rerun()
         
         # Show feedback section if scenario just ended
@@ -587,6 +689,7 @@ def show_game():
                         )
                         st.session_state.feedback_text = feedback
                         st.session_state.show_feedback_modal = True
+                        journal('feedback_text', 'show_feedback_modal')
                         st.rerun()
             
             if st.session_state.get('show_feedback_modal', False) and st.session_state.feedback_text:
@@ -621,6 +724,8 @@ def show_game():
                     st.session_state.last_scenario = None
                     st.session_state.scenario_start_value = None
                     st.session_state.scenario_end_value = None
+                    journal('show_feedback', 'show_feedback_modal', 'feedback_text', 'scenario_trades',
+                            'last_scenario', 'scenario_start_value', 'scenario_end_value')
                     st.rerun()
 
 
@@ -657,6 +762,7 @@ def show_game():
                 if st.session_state.cash >= package['price']:
                     st.session_state.cash -= package['price']
                     st.session_state.credits += package['credits']
+                    journal('cash', 'credits')
                     st.success(f"✅ Purchased {package['credits']} credits for ₹{package['price']}!")
                     st.rerun()
                 else:
@@ -667,7 +773,7 @@ def show_game():
         for stock_symbol, shares in st.session_state.portfolio.items():
             if shares > 0:
                 stock_display_name = stocks.get(stock_symbol, stock_symbol)
-                st.write(f"{stock_display_name}: {shares} shares (₹{shares * prices[stock_symbol]:,.2f})")
+                st.write(f"{stock_display_name}: {shares} shares (₹{shares * holding_price(stock_symbol):,.2f})")
 
         # Progress Bar for ROI
         st.progress(min(max(roi / 50, 0), 1))  # Up to 50% ROI
@@ -684,7 +790,9 @@ def show_game():
             user_id = st.session_state.get('user_id', f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}")
             save_game_score(user_id, total_value)
             st.success("Score updated!")
-        leaderboard = get_leaderboard()
+        leaderboard_window = st.radio("Leaderboard period", ["All time", "This week", "Today"], horizontal=True,
+                                      key="leaderboard_window", label_visibility="collapsed")
+        leaderboard = get_leaderboard({"All time": "all", "This week": "week", "Today": "day"}[leaderboard_window])
         for i, (user_id, score) in enumerate(leaderboard[:5], 1):
             st.write(f"{i}. {user_id}: ₹{score:,.2f}")
 
@@ -0,0 +1,257 @@
+import copy
+import hashlib
+import math
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+import pandas as pd
+
+# Technical indicators in two flavours:
+#  - incremental state objects whose update() costs O(1) per new bar, cached per
+#    (ticker, indicator, params) by IndicatorEngine so reruns only feed new bars;
+#  - compute_batch(), which computes a whole indicator set over a close array (or a
+#    tickers x days matrix) as NumPy arrays in one pass.
+
+
+class SMA:
+    """Simple moving average; with min_periods=1 the first values average what is available"""
+
+    def __init__(self, window, min_periods=1):
+        self.window = window
+        self.min_periods = min_periods
+        self._values = deque()
+        self._sum = 0.0
+
+    def update(self, value):
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        if len(self._values) < self.min_periods:
+            return math.nan
+        return self._sum / len(self._values)
+
+
+class EMA:
+    """Exponential moving average seeded with the first value (pandas ewm(adjust=False))"""
+
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class RSI:
+    """Relative strength index with Wilder's smoothing"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._previous = None
+        self._gain = EMA(2 * period - 1)  # alpha = 1 / period
+        self._loss = EMA(2 * period - 1)
+        self._count = 0
+
+    def update(self, value):
+        if self._previous is None:
+            self._previous = value
+            return math.nan
+        change = value - self._previous
+        self._previous = value
+        gain = self._gain.update(max(change, 0.0))
+        loss = self._loss.update(max(-change, 0.0))
+        self._count += 1
+        if self._count < self.period:
+            return math.nan
+        if loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+
+class MACD:
+    """MACD line, signal line and histogram"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+
+    def update(self, value):
+        line = self._fast.update(value) - self._slow.update(value)
+        signal = self._signal.update(line)
+        return line, signal, line - signal
+
+
+class Bollinger:
+    """Bollinger bands (middle, upper, lower) using the sample standard deviation"""
+
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self._values = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def update(self, value):
+        self._values.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+        n = len(self._values)
+        if n < self.window:
+            return math.nan, math.nan, math.nan
+        mean = self._sum / n
+        std = math.sqrt(max(self._sum_sq - n * mean * mean, 0.0) / (n - 1))
+        return mean, mean + self.num_std * std, mean - self.num_std * std
+
+
+INDICATORS = {
+    "sma": SMA,
+    "ema": EMA,
+    "rsi": RSI,
+    "macd": MACD,
+    "bollinger": Bollinger,
+}
+
+
+class IndicatorEngine:
+    """Caches indicator state per (ticker, indicator, params) and feeds it only new bars.
+
+    Each entry also keeps the state from before the last bar, because the provider
+    may revise the latest (intraday) bar; a revised bar is replayed from there.
+    Older bars change too (the price store re-adjusts the whole history after a
+    dividend or split), so entries keep a digest of every bar before the last and
+    start over when it no longer matches.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(values):
+        return hashlib.blake2b(np.ascontiguousarray(values), digest_size=16).digest()
+
+    def series(self, ticker, data, name, column='Close', **params):
+        """Return the indicator over data[column] as a NumPy array (rows x outputs for multi-output ones)"""
+        values = data[column].to_numpy(dtype=float)
+        if len(values) == 0:
+            return np.array([])
+        # Values depend on where the frame starts, so the first bar is part of the key
+        key = (ticker, name, tuple(sorted(params.items())), column, data.index[0])
+        last_date = data.index[-1]
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                dates = data.index
+                position = dates.searchsorted(entry["last_date"])
+                if (position >= len(dates) or dates[position] != entry["last_date"]
+                        or self._digest(values[:position]) != entry["prefix_digest"]):
+                    entry = None
+            if entry is None:
+                entry = {"indicator": INDICATORS[name](**params), "before_last": None,
+                         "last_date": None, "last_value": None, "prefix_digest": None, "outputs": []}
+                start = 0
+            elif values[position] != entry["last_value"]:
+                # The stored last bar was revised: roll back one bar and replay it
+                entry["indicator"] = entry["before_last"]
+                entry["outputs"].pop()
+                start = position
+            else:
+                start = position + 1
+
+            indicator = entry["indicator"]
+            outputs = entry["outputs"]
+            for i in range(start, len(values)):
+                if i == len(values) - 1:
+                    entry["before_last"] = copy.deepcopy(indicator)
+                outputs.append(indicator.update(values[i]))
+            # The bars before the last only change when a new last bar arrived
+            if entry["last_date"] != last_date:
+                entry["prefix_digest"] = self._digest(values[:-1])
+            entry["last_date"] = last_date
+            entry["last_value"] = values[-1]
+
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return np.array(outputs[:len(values)])
+
+
+# Process-wide engine shared by every page
+engine = IndicatorEngine()
+
+
+def _rolling_sum(values, window):
+    """Trailing window sums along the last axis (partial windows at the start)"""
+    cumulative = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    return cumulative - shifted
+
+
+def _ema(values, span):
+    return pd.DataFrame(values.T).ewm(span=span, adjust=False).mean().to_numpy().T
+
+
+def compute_batch(close, specs):
+    """Compute several indicators over a close array in one pass.
+
+    `close` is 1-D (days) or 2-D (tickers x days); `specs` maps an output name to
+    (indicator, params), e.g. {"sma_50": ("sma", {"window": 50})}. Returns
+    {output name: array}; multi-output indicators return a tuple of arrays.
+    Results match the incremental indicators above.
+    """
+    close = np.asarray(close, dtype=float)
+    squeeze = close.ndim == 1
+    close = np.atleast_2d(close)
+    days = close.shape[1]
+    counts = np.arange(1, days + 1)
+    changes = np.diff(close, axis=1)
+    results = {}
+    for output, (name, params) in specs.items():
+        if name == "sma":
+            window = params["window"]
+            sma = _rolling_sum(close, window) / np.minimum(counts, window)
+            sma[:, :params.get("min_periods", 1) - 1] = np.nan
+            result = sma
+        elif name == "ema":
+            result = _ema(close, params["span"])
+        elif name == "rsi":
+            period = params.get("period", 14)
+            gain = _ema(np.clip(changes, 0, None), 2 * period - 1)
+            loss = _ema(np.clip(-changes, 0, None), 2 * period - 1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+            rsi[:, :period - 1] = np.nan
+            result = np.concatenate([np.full((close.shape[0], 1), np.nan), rsi], axis=1)
+        elif name == "macd":
+            line = _ema(close, params.get("fast", 12)) - _ema(close, params.get("slow", 26))
+            signal = _ema(line, params.get("signal", 9))
+            result = (line, signal, line - signal)
+        elif name == "bollinger":
+            window = params.get("window", 20)
+            num_std = params.get("num_std", 2)
+            total = _rolling_sum(close, window)
+            total_sq = _rolling_sum(close * close, window)
+            mean = total / window
+            std = np.sqrt(np.maximum(total_sq - window * mean * mean, 0) / (window - 1))
+            mean[:, :window - 1] = np.nan
+            std[:, :window - 1] = np.nan
+            result = (mean, mean + num_std * std, mean - num_std * std)
+        else:
+            raise ValueError(f"Unknown indicator: {name}")
+        if squeeze:
+            result = tuple(part[0] for part in result) if isinstance(result, tuple) else result[0]
+        results[output] = result
+    return results
@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+import yfinance as yf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Market-data providers. Every module gets prices and ticker info through
+# get_provider() instead of calling yfinance directly, so the whole app can run
+# against recorded data (MARKET_DATA_PROVIDER=replay) for load tests and benchmarks.
+
+# Every ticker in the app trades on NSE/BSE; bar dates are interpreted in this timezone
+EXCHANGE_TIMEZONE = 'Asia/Kolkata'
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Number of trading bars used to answer a period from recorded data
+REPLAY_PERIOD_BARS = {
+    "1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126,
+    "1y": 252, "2y": 504, "5y": 1260, "10y": 2520,
+}
+
+
+class YFinanceProvider:
+    """Live data from Yahoo Finance"""
+
+    def today(self):
+        return datetime.now().date()
+
+    def history(self, symbol, period=None, start=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, auto_adjust=True)
+        return ticker.history(period=period, auto_adjust=True)
+
+    def download(self, symbols, period):
+        return yf.download(symbols, period=period, group_by="ticker", auto_adjust=True,
+                           threads=True, progress=False)
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+
+class ReplayProvider:
+    """Recorded OHLCV and .info payloads served from a directory.
+
+    Each symbol has `<symbol>.csv` (written by `record`) and optionally
+    `<symbol>.info.json`. Every call sleeps `latency` seconds to mimic the
+    network. Periods are counted back from the last recorded bar so results
+    don't drift with the wall clock.
+    """
+
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self._frames = {}
+        self._today = None
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, suffix):
+        return os.path.join(self.root, f"{symbol}{suffix}")
+
+    def _frame(self, symbol):
+        with self._lock:
+            frame = self._frames.get(symbol)
+        if frame is None:
+            path = self._path(symbol, ".csv")
+            if os.path.exists(path):
+                frame = pd.read_csv(path, index_col='Date')
+                frame.index = pd.to_datetime(frame.index, utc=True).tz_convert(EXCHANGE_TIMEZONE)
+                frame = frame.reindex(columns=OHLCV_COLUMNS).fillna({'Dividends': 0, 'Stock Splits': 0})
+            else:
+                frame = pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date', tz=EXCHANGE_TIMEZONE))
+            with self._lock:
+                self._frames[symbol] = frame
+        return frame
+
+    def today(self):
+        if self._today is None:
+            override = os.getenv("MARKET_DATA_REPLAY_TODAY")
+            if override:
+                self._today = datetime.strptime(override, '%Y-%m-%d').date()
+            else:
+                names = os.listdir(self.root) if os.path.isdir(self.root) else []
+                last_dates = [self._frame(name[:-4]).index.max() for name in names if name.endswith(".csv")]
+                last_dates = [date for date in last_dates if pd.notna(date)]
+                self._today = max(last_dates).date() if last_dates else datetime.now().date()
+        return self._today
+
+    def history(self, symbol, period=None, start=None):
+        time.sleep(self.latency)
+        return self._slice(symbol, period, start)
+
+    def _slice(self, symbol, period=None, start=None):
+        frame = self._frame(symbol)
+        if start is not None:
+            return frame[frame.index.strftime('%Y-%m-%d') >= str(start)].copy()
+        if period in (None, "max"):
+            return frame.copy()
+        if period == "ytd":
+            return frame[frame.index.year == frame.index.max().year].copy()
+        return frame.iloc[-REPLAY_PERIOD_BARS[period]:].copy()
+
+    def download(self, symbols, period):
+        # One round trip for the whole batch
+        time.sleep(self.latency)
+        frames = {symbol: self._slice(symbol, period=period) for symbol in symbols}
+        frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def info(self, symbol):
+        time.sleep(self.latency)
+        path = self._path(symbol, ".info.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Return the process-wide provider selected by MARKET_DATA_PROVIDER (yfinance or replay)"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if os.getenv("MARKET_DATA_PROVIDER", "yfinance") == "replay":
+                _provider = ReplayProvider(
+                    os.getenv("MARKET_DATA_REPLAY_DIR", "replay_data"),
+                    latency=float(os.getenv("MARKET_DATA_REPLAY_LATENCY_MS", "0")) / 1000,
+                )
+            else:
+                _provider = YFinanceProvider()
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (benchmarks and load tests)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def record(symbols, root, period="max", with_info=True):
+    """Record live history (and .info) for `symbols` into a replay directory"""
+    live = YFinanceProvider()
+    os.makedirs(root, exist_ok=True)
+    for symbol in symbols:
+        history = live.history(symbol, period=period)
+        if history.empty:
+            print(f"No data for {symbol}, skipped")
+            continue
+        history.reindex(columns=OHLCV_COLUMNS).to_csv(os.path.join(root, f"{symbol}.csv"), index_label='Date')
+        if with_info:
+            with open(os.path.join(root, f"{symbol}.info.json"), "w") as f:
+                json.dump(live.info(symbol), f, default=str)
+        print(f"Recorded {len(history)} bars for {symbol}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Market data tools for the replay provider")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Record live market data for the replay provider")
+    record_parser.add_argument("symbols", nargs="*", help="Symbols to record (default: the dashboard universe and indices)")
+    record_parser.add_argument("--dir", default="replay_data")
+    record_parser.add_argument("--period", default="max")
+    record_parser.add_argument("--no-info", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        symbols = args.symbols
+        if not symbols:
+            from symbols import nse_tickers, INDEX_TICKERS
+            symbols = list(nse_tickers.values()) + list(INDEX_TICKERS.values())
+        record(symbols, args.dir, period=args.period, with_info=not args.no_info)
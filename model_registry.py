@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import joblib
+import numpy as np
+
+# Serving side of the price prediction model. The model is loaded and checked
+# once per process and reloaded only when the file on disk changes; predictions
+# are a dot product over NumPy lag arrays instead of a call into scikit-learn.
+#
+# Artifacts written by train.py (models/<version>.json, pointed to by
+# models/latest.json) take precedence over the notebook's pickle.
+MODEL_PATH = "linear_regression_model.pkl"
+MODELS_DIR = "models"
+LATEST_POINTER = os.path.join(MODELS_DIR, "latest.json")
+
+# Lagged closes the model was trained on, most recent first
+FEATURES = (
+    'Price_yes',
+    'Price_2day_before',
+    'Price_3day_before',
+    'Price_4day_before',
+    'Price_5day_before',
+)
+
+
+class LinearModel:
+    """Coefficients of a fitted linear model, optionally with per-ticker coefficients"""
+
+    def __init__(self, coef, intercept, per_ticker=None, version=None, metadata=None, path=None, stamp=None):
+        self.coef = np.asarray(coef, dtype=float).reshape(len(FEATURES))
+        self.intercept = float(intercept)
+        # {ticker: (coef, intercept)}
+        self.per_ticker = per_ticker or {}
+        self.version = version
+        self.metadata = metadata or {}
+        self.path = path
+        self.stamp = stamp
+
+    def params_for(self, ticker):
+        return self.per_ticker.get(ticker, (self.coef, self.intercept))
+
+    def predict(self, lags, tickers=None):
+        """Predict from a lag vector (returns a float) or a rows x lags matrix (returns an array).
+
+        `tickers` (one symbol for a vector, one per row for a matrix) selects
+        per-ticker coefficients where the model has them.
+        """
+        lags = np.asarray(lags, dtype=float)
+        if lags.shape[-1] != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} lags, got {lags.shape[-1]}")
+        if lags.ndim == 1:
+            coef, intercept = self.params_for(tickers)
+            return float(lags @ coef + intercept)
+        if not self.per_ticker or tickers is None:
+            return lags @ self.coef + self.intercept
+        params = [self.params_for(ticker) for ticker in tickers]
+        coef = np.array([p[0] for p in params])
+        intercept = np.array([p[1] for p in params])
+        return np.einsum('ij,ij->i', lags, coef) + intercept
+
+
+def _from_estimator(estimator, **kwargs):
+    n_features = getattr(estimator, 'n_features_in_', None)
+    if n_features != len(FEATURES):
+        raise ValueError(f"Model expects {n_features} features, not {len(FEATURES)}")
+    names = getattr(estimator, 'feature_names_in_', None)
+    if names is not None and tuple(names) != FEATURES:
+        raise ValueError(f"Model features {list(names)} don't match {list(FEATURES)}")
+    return LinearModel(estimator.coef_, np.ravel(estimator.intercept_)[0], **kwargs)
+
+
+def _from_artifact(artifact, **kwargs):
+    if tuple(artifact['features']) != FEATURES:
+        raise ValueError(f"Model features {artifact['features']} don't match {list(FEATURES)}")
+    per_ticker = {ticker: (np.asarray(fit['coef'], dtype=float), float(fit['intercept']))
+                  for ticker, fit in artifact.get('per_ticker', {}).items()}
+    return LinearModel(artifact['coef'], artifact['intercept'], per_ticker=per_ticker,
+                       version=artifact['version'], metadata=artifact, **kwargs)
+
+
+def load_model(path, stamp=None):
+    """Load and validate a model from a train.py artifact (.json) or a scikit-learn pickle"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return _from_artifact(json.load(f), path=path, stamp=stamp)
+    return _from_estimator(joblib.load(path), version=os.path.basename(path), path=path, stamp=stamp)
+
+
+def latest_artifact():
+    """Path of the artifact models/latest.json points to, or None"""
+    try:
+        with open(LATEST_POINTER) as f:
+            return os.path.join(MODELS_DIR, json.load(f)['file'])
+    except FileNotFoundError:
+        return None
+
+
+_models = {}
+_lock = threading.Lock()
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_model(path=None):
+    """Return the model at `path` (default: the latest artifact, else the pickle).
+
+    The model is reloaded when the file changed since it was loaded. If a changed
+    file fails to load or validate, the previously loaded model keeps serving and
+    the error is printed.
+    """
+    path = path or latest_artifact() or MODEL_PATH
+    stamp = _stamp(path)
+    model = _models.get(path)
+    if model is not None and model.stamp == stamp:
+        return model
+    with _lock:
+        model = _models.get(path)
+        if model is not None and model.stamp == stamp:
+            return model
+        try:
+            model = load_model(path, stamp=stamp)
+        except Exception as e:
+            if model is None:
+                raise
+            print(f"Failed to reload model from {path}, keeping the loaded one: {e}")
+            model.stamp = stamp
+            return model
+        _models[path] = model
+        return model
+
+
+def predict(lags, tickers=None, path=None):
+    return get_model(path).predict(lags, tickers)
+
+
+# Model types the dashboard can predict with
+MODEL_TYPES = ("batch", "online")
+
+
+def get_predictor(model_type="batch", ticker_symbol=None):
+    """The served batch model, or a ticker's online model brought up to date with the store"""
+    if model_type == "online":
+        from online_model import update_online
+        return update_online(ticker_symbol)
+    return get_model()
@@ -0,0 +1,168 @@
+import sqlite3
+from datetime import datetime
+import numpy as np
+import price_store
+from features import lag_matrix, normalize_lags
+from model_registry import FEATURES
+
+# Per-ticker online version of the lag model, updated bar by bar with recursive
+# least squares instead of retraining. Lags are taken relative to the latest close
+# (see features.normalize_lags) so one state works at any price level, and a
+# forgetting factor lets old bars fade out.
+#
+# The stored state has consumed every bar except the latest one, which may still
+# be an intraday bar that changes. Predictions apply the latest bar to a copy of
+# the state, so a revised bar never has to be taken back.
+LAGS = len(FEATURES)
+
+# Weight of a bar drops by this factor every new bar (~200 bars of memory)
+FORGETTING = 0.995
+
+# Initial P = INITIAL_VARIANCE * I: the first bars move the coefficients freely
+INITIAL_VARIANCE = 1000.0
+
+PARAMETERS = LAGS  # intercept + the LAGS - 1 lags relative to the latest close
+
+_initialized = False
+
+
+def _connect():
+    return sqlite3.connect(price_store.DB_PATH, timeout=30)
+
+
+def init_online_db():
+    """Initialize the online model state table (once per process)"""
+    global _initialized
+    if _initialized:
+        return
+    conn = _connect()
+    conn.execute('''CREATE TABLE IF NOT EXISTS online_models
+                    (ticker TEXT PRIMARY KEY,
+                     last_date TEXT NOT NULL,
+                     bars INTEGER NOT NULL,
+                     theta BLOB NOT NULL,
+                     p BLOB NOT NULL,
+                     updated_at TEXT NOT NULL)''')
+    conn.commit()
+    conn.close()
+    _initialized = True
+
+
+def _design(lags):
+    """Regression inputs for lag rows: an intercept and lags 2..5 relative to the latest close"""
+    relative = normalize_lags(lags)[..., 1:]
+    return np.concatenate([np.ones(relative.shape[:-1] + (1,)), relative], axis=-1)
+
+
+class RLSState:
+    """Recursive least squares with exponential forgetting; O(k^2) per update"""
+
+    def __init__(self, theta=None, p=None, bars=0, last_date=None, forgetting=FORGETTING):
+        self.theta = np.zeros(PARAMETERS) if theta is None else theta
+        self.p = np.eye(PARAMETERS) * INITIAL_VARIANCE if p is None else p
+        self.bars = bars
+        self.last_date = last_date
+        self.forgetting = forgetting
+
+    def copy(self):
+        return RLSState(self.theta.copy(), self.p.copy(), self.bars, self.last_date, self.forgetting)
+
+    def update(self, x, y):
+        px = self.p @ x
+        gain = px / (self.forgetting + x @ px)
+        self.theta = self.theta + gain * (y - x @ self.theta)
+        p = (self.p - np.outer(gain, px)) / self.forgetting
+        self.p = (p + p.T) / 2
+        self.bars += 1
+
+    def consume(self, lags, targets, dates):
+        """Feed lag rows (most recent first) and the closes that followed them"""
+        inputs = _design(lags)
+        outputs = targets / lags[:, 0] - 1
+        for x, y in zip(inputs, outputs):
+            self.update(x, y)
+        if len(dates):
+            self.last_date = dates[-1]
+
+
+def load_state(ticker_symbol):
+    init_online_db()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT last_date, bars, theta, p FROM online_models WHERE ticker = ?",
+                           (ticker_symbol,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    last_date, bars, theta, p = row
+    return RLSState(np.frombuffer(theta).copy(), np.frombuffer(p).reshape(PARAMETERS, PARAMETERS).copy(),
+                    bars, last_date)
+
+
+def save_state(ticker_symbol, state):
+    init_online_db()
+    conn = _connect()
+    try:
+        conn.execute('''INSERT INTO online_models (ticker, last_date, bars, theta, p, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(ticker) DO UPDATE SET last_date = excluded.last_date, bars = excluded.bars,
+                        theta = excluded.theta, p = excluded.p, updated_at = excluded.updated_at''',
+                     (ticker_symbol, state.last_date, state.bars, state.theta.tobytes(), state.p.tobytes(),
+                      datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class OnlineModel:
+    """One ticker's RLS state, with the same predict() interface as model_registry.LinearModel"""
+
+    def __init__(self, ticker_symbol, state):
+        self.ticker_symbol = ticker_symbol
+        self.state = state
+        self.version = f"online RLS, {state.bars} bars through {state.last_date}"
+
+    def predict(self, lags, tickers=None):
+        lags = np.asarray(lags, dtype=float)
+        if lags.shape[-1] != LAGS:
+            raise ValueError(f"Expected {LAGS} lags, got {lags.shape[-1]}")
+        prediction = lags[..., 0] * (1 + _design(lags) @ self.state.theta)
+        return float(prediction) if lags.ndim == 1 else prediction
+
+
+def update_online(ticker_symbol, period="max"):
+    """Bring a ticker's stored state up to the bar before the latest one and return the model.
+
+    The returned model has also seen the latest bar.
+    """
+    dates, close = price_store.load_closes(ticker_symbol, period)
+    finite = np.isfinite(close)
+    dates = [date for date, ok in zip(dates, finite) if ok]
+    close = close[finite]
+    if len(close) <= LAGS:
+        raise ValueError(f"Not enough stored prices for {ticker_symbol}")
+
+    # Row i of the lag matrix precedes target close[i + LAGS]
+    lags = lag_matrix(close[:-1], LAGS)
+    targets = close[LAGS:]
+    target_dates = dates[LAGS:]
+
+    final = len(targets) - 1
+    state = load_state(ticker_symbol)
+    start = 0
+    if state is not None:
+        # Resume after the last consumed bar; start over if it is no longer stored
+        start = np.searchsorted(target_dates, state.last_date, side='right')
+        if start == 0 or start > final or target_dates[start - 1] != state.last_date:
+            state, start = None, 0
+    if state is None:
+        state = RLSState()
+
+    if start < final:
+        state.consume(lags[start:final], targets[start:final], target_dates[start:final])
+        save_state(ticker_symbol, state)
+
+    current = state.copy()
+    current.consume(lags[final:], targets[final:], target_dates[final:])
+    return OnlineModel(ticker_symbol, current)
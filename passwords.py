@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Password hashing for auth. Passwords are hashed with scrypt (memory-hard, salted)
+# and stored as "scrypt$n$r$p$salt$hash", so the cost can be raised later without
+# invalidating existing hashes: a hash made with other parameters, or a legacy
+# unsalted SHA-256 hex digest, still verifies and is flagged for rehashing.
+#
+# Each hash takes tens of milliseconds and 128 * n * r bytes of memory, so hashing
+# runs on a bounded pool: during a login burst the requests queue instead of every
+# session hashing at once. hashlib.scrypt releases the GIL, so threads are enough.
+
+# Named cost settings: scrypt (n, r, p)
+COSTS = {
+    'low': (2 ** 13, 8, 1),
+    'interactive': (2 ** 14, 8, 1),
+    'moderate': (2 ** 15, 8, 1),
+    'high': (2 ** 16, 8, 1),
+}
+
+COST = os.getenv("PASSWORD_HASH_COST", "interactive")
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or os.cpu_count() or 1
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+SCHEME = "scrypt"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL refuses to use more than maxmem; leave room above the 128 * n * r it needs
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p + 2 ** 20, dklen=HASH_BYTES)
+
+
+def hash_password(password, cost=None):
+    """Salted scrypt hash of a password in the stored "scrypt$n$r$p$salt$hash" format"""
+    n, r, p = COSTS[cost or COST]
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{SCHEME}${n}${r}${p}${salt.hex()}${_scrypt(password, salt, n, r, p).hex()}"
+
+
+def _legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(password, stored, cost=None):
+    """Check a password against a stored hash; returns (matches, needs_rehash)"""
+    if not stored.startswith(SCHEME + "$"):
+        # Unsalted SHA-256 from before scrypt
+        return hmac.compare_digest(_legacy_hash(password), stored), True
+    try:
+        _, n, r, p, salt, expected = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        actual = _scrypt(password, bytes.fromhex(salt), n, r, p)
+        expected = bytes.fromhex(expected)
+    except ValueError:
+        return False, False
+    return hmac.compare_digest(actual, expected), (n, r, p) != COSTS[cost or COST]
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password-hash")
+    return _pool
+
+
+def hash_password_async(password, cost=None):
+    """Hash a password on the hashing pool; returns a future"""
+    return _get_pool().submit(hash_password, password, cost)
+
+
+def verify_password_async(password, stored, cost=None):
+    """Verify a password on the hashing pool; returns a future of (matches, needs_rehash)"""
+    return _get_pool().submit(verify_password, password, stored, cost)
+
+
+# Stand-in hash for unknown emails, so they take as long to reject as a wrong password
+_dummy_hashes = {}
+
+
+def dummy_hash(cost=None):
+    cost = cost or COST
+    if cost not in _dummy_hashes:
+        _dummy_hashes[cost] = hash_password(secrets.token_hex(8), cost)
+    return _dummy_hashes[cost]
+
+
+def benchmark(cost, logins, workers):
+    """Logins per second and latency percentiles for `logins` concurrent verifications on `workers` threads"""
+    stored = hash_password("benchmark-password", cost)
+    latencies = []
+
+    def login(_):
+        start = time.perf_counter()
+        verify_password("benchmark-password", stored, cost)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    n, r, p = COSTS[cost]
+    return {
+        'Cost': cost,
+        'n': n,
+        'Memory per hash (MiB)': 128 * n * r * p / 2 ** 20,
+        'Logins/s': logins / elapsed,
+        # Time spent hashing, not counting time queued behind other logins
+        'p50 ms': latencies[len(latencies) // 2] * 1000,
+        'p95 ms': latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark password verification throughput at each cost setting")
+    parser.add_argument("costs", nargs="*", help=f"Cost settings to benchmark: {', '.join(COSTS)} (default: all)")
+    parser.add_argument("--logins", type=int, default=64, help="Verifications per cost setting")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Hashing threads (default: PASSWORD_HASH_WORKERS or all cores)")
+    args = parser.parse_args()
+    unknown = [cost for cost in args.costs if cost not in COSTS]
+    if unknown:
+        parser.error(f"Unknown cost settings: {', '.join(unknown)}")
+
+    print(f"{args.workers} hashing threads, {args.logins} logins per setting (current setting: {COST})")
+    for cost in args.costs or COSTS:
+        result = benchmark(cost, args.logins, args.workers)
+        print("  ".join(f"{name}: {value:.1f}" if isinstance(value, float) else f"{name}: {value}"
+                        for name, value in result.items()))
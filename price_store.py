@@ -0,0 +1,338 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from market_data import get_provider, EXCHANGE_TIMEZONE
+
+# Local OHLCV store shared by the dashboard, the game and the chatbot.
+# Bars are kept per (ticker, date) and only the bars after the last stored
+# date are downloaded on later requests.
+DB_PATH = 'prices.db'
+
+# Don't ask the provider for new bars more often than this for the same ticker
+REFRESH_INTERVAL = timedelta(minutes=5)
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Calendar span needed to answer each yfinance period from the store
+PERIOD_SPANS = {
+    "1d": timedelta(days=31),
+    "5d": timedelta(days=31),
+    "1mo": timedelta(days=31),
+    "3mo": timedelta(days=92),
+    "6mo": timedelta(days=183),
+    "1y": timedelta(days=366),
+    "2y": timedelta(days=731),
+    "5y": timedelta(days=1827),
+    "10y": timedelta(days=3653),
+}
+
+# Periods that are answered with the last N bars instead of a date range
+PERIOD_BARS = {"1d": 1, "5d": 5}
+
+
+def _connect():
+    return sqlite3.connect(DB_PATH, timeout=30)
+
+
+def connect():
+    """Open a connection to the price store for reading its tables; the caller closes it"""
+    init_price_db()
+    return _connect()
+
+
+_initialized = False
+
+
+def init_price_db():
+    """Initialize the price store tables (once per process)"""
+    global _initialized
+    if _initialized:
+        return
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS prices
+                 (ticker TEXT NOT NULL,
+                  date TEXT NOT NULL,
+                  open REAL,
+                  high REAL,
+                  low REAL,
+                  close REAL,
+                  volume REAL,
+                  dividends REAL,
+                  stock_splits REAL,
+                  PRIMARY KEY (ticker, date)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS price_meta
+                 (ticker TEXT PRIMARY KEY,
+                  covered_from TEXT,
+                  last_checked TEXT NOT NULL)''')
+    # Materialized calendar rollups, kept in step with the prices table
+    for table, bucket in (('monthly_rollups', 'month'), ('yearly_rollups', 'year')):
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                     (ticker TEXT NOT NULL,
+                      {bucket} TEXT NOT NULL,
+                      open REAL,
+                      high REAL,
+                      low REAL,
+                      close REAL,
+                      volume REAL,
+                      dividends REAL,
+                      stock_splits REAL,
+                      bars INTEGER NOT NULL,
+                      PRIMARY KEY (ticker, {bucket})) WITHOUT ROWID''')
+    # Bumped whenever stored bars change, so readers can cache derived data until it changes
+    c.execute('''CREATE TABLE IF NOT EXISTS store_version
+                 (id INTEGER PRIMARY KEY CHECK (id = 0),
+                  version INTEGER NOT NULL)''')
+    c.execute("INSERT OR IGNORE INTO store_version VALUES (0, 0)")
+    # The store version at each ticker's latest change, so readers can tell which tickers changed
+    c.execute('''CREATE TABLE IF NOT EXISTS ticker_versions
+                 (ticker TEXT PRIMARY KEY,
+                  version INTEGER NOT NULL) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_ticker_versions_version ON ticker_versions (version)")
+    conn.commit()
+    conn.close()
+    _initialized = True
+
+
+def period_start(period, today=None):
+    """Return the first date (YYYY-MM-DD) covered by a yfinance period, or None for 'max'"""
+    today = today or get_provider().today()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1).strftime('%Y-%m-%d')
+    span = PERIOD_SPANS.get(period)
+    if span is None:
+        raise ValueError(f"Unsupported period: {period}")
+    return (today - span).strftime('%Y-%m-%d')
+
+
+def _to_rows(ticker_symbol, history):
+    """Convert a yfinance history frame into rows for the prices table"""
+    if history.empty:
+        return []
+    history = history.reindex(columns=PRICE_COLUMNS).fillna({'Dividends': 0, 'Stock Splits': 0})
+    dates = history.index.strftime('%Y-%m-%d')
+    values = history[PRICE_COLUMNS].astype(float).values.tolist()
+    return [(ticker_symbol, date, *row) for date, row in zip(dates, values)]
+
+
+def _download(ticker_symbol, period=None, start=None):
+    return get_provider().history(ticker_symbol, period=period, start=start)
+
+
+def _update_rollups(c, ticker_symbol, since=None):
+    """Recompute the monthly and yearly rollups touched by bars on or after `since` (all when None)"""
+    since = since or ""
+    first_month = since[:7]
+    first_year = since[:4]
+    c.execute("DELETE FROM monthly_rollups WHERE ticker = ? AND month >= ?", (ticker_symbol, first_month))
+    c.execute('''INSERT INTO monthly_rollups
+                 SELECT ticker, substr(date, 1, 7), AVG(open), MAX(high), MIN(low), AVG(close),
+                        SUM(volume), SUM(dividends), SUM(stock_splits), COUNT(*)
+                 FROM prices WHERE ticker = ? AND date >= ?
+                 GROUP BY substr(date, 1, 7)''', (ticker_symbol, first_month))
+    # Years are rolled up from their months; means are weighted by the number of bars
+    c.execute("DELETE FROM yearly_rollups WHERE ticker = ? AND year >= ?", (ticker_symbol, first_year))
+    c.execute('''INSERT INTO yearly_rollups
+                 SELECT ticker, substr(month, 1, 4), SUM(open * bars) / SUM(bars), MAX(high), MIN(low),
+                        SUM(close * bars) / SUM(bars), SUM(volume), SUM(dividends), SUM(stock_splits), SUM(bars)
+                 FROM monthly_rollups WHERE ticker = ? AND month >= ?
+                 GROUP BY substr(month, 1, 4)''', (ticker_symbol, first_year))
+
+
+_VALUE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'dividends', 'stock_splits')
+
+# Writes a bar only when it is new or one of its values differs from the stored bar
+_UPSERT = ("INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(ticker, date) DO UPDATE SET "
+           + ", ".join(f"{column} = excluded.{column}" for column in _VALUE_COLUMNS)
+           + " WHERE " + " OR ".join(f"{column} IS NOT excluded.{column}" for column in _VALUE_COLUMNS))
+
+
+def _store(conn, ticker_symbol, rows, covered_from, replace_all=False):
+    if replace_all and not rows:
+        # yfinance returns an empty frame instead of raising when a download fails:
+        # keep what is stored and leave the ticker due for another try
+        return
+    c = conn.cursor()
+    before = conn.total_changes
+    if replace_all:
+        # Drop only the bars the new download no longer has, and only within the
+        # dates it spans: bars outside a truncated download are kept. The rest are upserted.
+        dates = [row[1] for row in rows]
+        c.execute('''DELETE FROM prices WHERE ticker = ? AND date BETWEEN ? AND ?
+                     AND date NOT IN (SELECT value FROM json_each(?))''',
+                  (ticker_symbol, min(dates), max(dates), json.dumps(dates)))
+    c.executemany(_UPSERT, rows)
+    if conn.total_changes != before:
+        _update_rollups(c, ticker_symbol, since=min(row[1] for row in rows))
+        c.execute("UPDATE store_version SET version = version + 1")
+        c.execute('''INSERT INTO ticker_versions (ticker, version) SELECT ?, version FROM store_version WHERE true
+                     ON CONFLICT(ticker) DO UPDATE SET version = excluded.version''', (ticker_symbol,))
+    c.execute('''INSERT INTO price_meta (ticker, covered_from, last_checked) VALUES (?, ?, ?)
+                 ON CONFLICT(ticker) DO UPDATE SET covered_from = excluded.covered_from,
+                                                  last_checked = excluded.last_checked''',
+              (ticker_symbol, covered_from, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    conn.commit()
+
+
+def update_history(ticker_symbol, period):
+    """Make sure the store covers `period` for a ticker, downloading only missing bars"""
+    init_price_db()
+    needed_from = period_start(period)
+    conn = _connect()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT covered_from, last_checked FROM price_meta WHERE ticker = ?", (ticker_symbol,))
+        meta = c.fetchone()
+        c.execute("SELECT MAX(date) FROM prices WHERE ticker = ?", (ticker_symbol,))
+        last_date = c.fetchone()[0]
+
+        fresh = meta is not None and (
+            datetime.now() - datetime.strptime(meta[1], '%Y-%m-%d %H:%M:%S') < REFRESH_INTERVAL)
+
+        # Nothing stored yet, or the request reaches further back than what we have:
+        # download the whole period once.
+        if meta is None or (last_date is None and not fresh) or (
+                meta[0] is not None and (needed_from is None or needed_from < meta[0])):
+            if needed_from is None:
+                history = _download(ticker_symbol, period="max")
+            else:
+                history = _download(ticker_symbol, start=needed_from)
+            _store(conn, ticker_symbol, _to_rows(ticker_symbol, history), needed_from, replace_all=True)
+            return
+
+        if fresh or last_date is None:
+            return
+
+        # Re-download the last stored bar as well, it may have been an intraday partial bar
+        history = _download(ticker_symbol, start=last_date)
+        rows = _to_rows(ticker_symbol, history)
+        new_rows = [row for row in rows if row[1] > last_date]
+        if any(row[7] or row[8] for row in new_rows):
+            # A dividend or split changes every adjusted price before it
+            if meta[0] is None:
+                history = _download(ticker_symbol, period="max")
+            else:
+                history = _download(ticker_symbol, start=meta[0])
+            _store(conn, ticker_symbol, _to_rows(ticker_symbol, history), meta[0], replace_all=True)
+        else:
+            _store(conn, ticker_symbol, rows, meta[0])
+    finally:
+        conn.close()
+
+
+def load_history(ticker_symbol, period):
+    """Read a ticker's bars for `period` from the store, indexed by a tz-aware DatetimeIndex"""
+    init_price_db()
+    conn = _connect()
+    try:
+        columns = "date, open, high, low, close, volume, dividends, stock_splits"
+        if period in PERIOD_BARS:
+            query = f"SELECT {columns} FROM prices WHERE ticker = ? ORDER BY date DESC LIMIT ?"
+            data = pd.read_sql_query(query, conn, params=(ticker_symbol, PERIOD_BARS[period]))
+            data = data.iloc[::-1]
+        else:
+            start = period_start(period) or ""
+            query = f"SELECT {columns} FROM prices WHERE ticker = ? AND date >= ? ORDER BY date"
+            data = pd.read_sql_query(query, conn, params=(ticker_symbol, start))
+    finally:
+        conn.close()
+    data.columns = ['Date'] + PRICE_COLUMNS
+    data.index = pd.DatetimeIndex(pd.to_datetime(data.pop('Date')), name='Date').tz_localize(EXCHANGE_TIMEZONE)
+    return data
+
+
+def load_closes(ticker_symbol, period):
+    """Read a ticker's closes for `period` as (dates, float array) without building a DataFrame"""
+    init_price_db()
+    start = period_start(period) or ""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT date, close FROM prices WHERE ticker = ? AND date >= ? ORDER BY date",
+                            (ticker_symbol, start)).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows], np.array([row[1] for row in rows], dtype=float)
+
+
+def store_version():
+    """Counter that changes whenever any bars are added, revised or replaced"""
+    init_price_db()
+    conn = _connect()
+    try:
+        return conn.execute("SELECT version FROM store_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def changed_since(version):
+    """Tickers whose bars changed after store_version() returned `version`"""
+    init_price_db()
+    conn = _connect()
+    try:
+        return [row[0] for row in conn.execute("SELECT ticker FROM ticker_versions WHERE version > ?", (version,))]
+    finally:
+        conn.close()
+
+
+def get_history(ticker_symbol, period):
+    """Return a ticker's bars for `period`, updating the store first"""
+    try:
+        update_history(ticker_symbol, period)
+    except Exception as e:
+        # Serve whatever is already stored if the provider is unreachable
+        print(f"Price store update failed for {ticker_symbol}: {e}")
+    return load_history(ticker_symbol, period)
+
+
+ROLLUP_COLUMNS = "open, high, low, close, volume, dividends, stock_splits"
+
+
+def _rollup_frame(rows, bucket_format):
+    data = pd.DataFrame(rows, columns=['Bucket'] + PRICE_COLUMNS)
+    index = pd.to_datetime(data.pop('Bucket'), format=bucket_format)
+    data.index = pd.DatetimeIndex(index, name='Date').tz_localize(EXCHANGE_TIMEZONE)
+    return data
+
+
+def load_rollups(ticker_symbol, period):
+    """Return (yearly, monthly) rollups of a ticker's bars within `period`.
+
+    Whole years and months come straight from the materialized tables; only the
+    partial bucket at the start of the period is aggregated from raw bars. Frames
+    are indexed by the start of each year / month, with Open and Close averaged,
+    High the max, Low the min and the other columns summed.
+    """
+    init_price_db()
+    start = period_start(period) or ""
+    conn = _connect()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM monthly_rollups WHERE ticker = ? LIMIT 1", (ticker_symbol,))
+        if c.fetchone() is None:
+            # Bars stored before rollups existed
+            _update_rollups(c, ticker_symbol)
+            conn.commit()
+
+        aggregates = ("AVG(open), MAX(high), MIN(low), AVG(close), "
+                      "SUM(volume), SUM(dividends), SUM(stock_splits)")
+        frames = []
+        for table, bucket, width, bucket_format in (('yearly_rollups', 'year', 4, '%Y'),
+                                                    ('monthly_rollups', 'month', 7, '%Y-%m')):
+            rows = []
+            if start:
+                c.execute(f'''SELECT substr(date, 1, {width}), {aggregates} FROM prices
+                              WHERE ticker = ? AND date >= ? AND substr(date, 1, {width}) = ?
+                              GROUP BY substr(date, 1, {width})''',
+                          (ticker_symbol, start, start[:width]))
+                rows = c.fetchall()
+            c.execute(f"SELECT {bucket}, {ROLLUP_COLUMNS} FROM {table} WHERE ticker = ? AND {bucket} > ? ORDER BY {bucket}",
+                      (ticker_symbol, start[:width]))
+            rows += c.fetchall()
+            frames.append(_rollup_frame(rows, bucket_format))
+    finally:
+        conn.close()
+    return frames[0], frames[1]
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from market_data import get_provider
+
+QUOTE_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# Upper bound on parallel single-symbol requests when the bulk download misses symbols
+FALLBACK_WORKERS = 8
+
+
+def _last_bar(history):
+    """Return the latest complete bar of a history frame as a quote row, or None"""
+    history = history.dropna(subset=['Close'])
+    if history.empty:
+        return None
+    bar = history.iloc[-1]
+    return {
+        'Date': history.index[-1].strftime('%Y-%m-%d'),
+        'Open': bar['Open'],
+        'High': bar['High'],
+        'Low': bar['Low'],
+        'Close': bar['Close'],
+        'Volume': bar['Volume'],
+    }
+
+
+def _fetch_one(symbol):
+    try:
+        return _last_bar(get_provider().history(symbol, period="1d"))
+    except Exception:
+        return None
+
+
+def get_quotes(symbols, period="5d"):
+    """Fetch the latest bar for many symbols with one bulk download.
+
+    Returns a frame indexed by symbol (in the order given) with the columns in
+    QUOTE_COLUMNS. Symbols missing from the bulk download are retried one by one
+    on a small thread pool; symbols that still fail are left as NaN rows.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    quotes = {}
+    if symbols:
+        try:
+            bulk = get_provider().download(symbols, period)
+        except Exception:
+            bulk = pd.DataFrame()
+        if not bulk.empty and isinstance(bulk.columns, pd.MultiIndex):
+            for symbol in bulk.columns.get_level_values(0).unique():
+                if symbol in symbols:
+                    row = _last_bar(bulk[symbol])
+                    if row is not None:
+                        quotes[symbol] = row
+
+    missing = [symbol for symbol in symbols if symbol not in quotes]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(FALLBACK_WORKERS, len(missing))) as pool:
+            for symbol, row in zip(missing, pool.map(_fetch_one, missing)):
+                if row is not None:
+                    quotes[symbol] = row
+
+    return pd.DataFrame.from_dict(quotes, orient='index', columns=QUOTE_COLUMNS).reindex(symbols)
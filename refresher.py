@@ -0,0 +1,86 @@
+import threading
+import time
+
+# Background stale-while-revalidate refresher. Jobs are loaded on a daemon thread and
+# page renders read the last good snapshot, so a render never waits on the network.
+
+_jobs = {}  # name -> {"loader", "interval", "next_run"}
+_snapshots = {}  # name -> (value, fetched_at)
+_errors = {}  # name -> last exception message
+_ready = {}  # name -> threading.Event set after the first successful load
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_thread = None
+
+
+def register(name, loader, interval=60):
+    """Register a job that refreshes snapshot `name` every `interval` seconds and start the refresher"""
+    with _lock:
+        if name not in _jobs:
+            _jobs[name] = {"loader": loader, "interval": interval, "next_run": 0}
+            _ready[name] = threading.Event()
+    _wakeup.set()
+    start()
+
+
+def start():
+    """Start the refresher thread once per process"""
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="market-refresher", daemon=True)
+            _thread.start()
+
+
+def _run():
+    while True:
+        _wakeup.clear()
+        now = time.monotonic()
+        with _lock:
+            due = [(name, job) for name, job in _jobs.items() if job["next_run"] <= now]
+        for name, job in due:
+            try:
+                value = job["loader"]()
+                with _lock:
+                    _snapshots[name] = (value, time.time())
+                    _errors.pop(name, None)
+                _ready[name].set()
+            except Exception as e:
+                # Keep serving the last good snapshot
+                with _lock:
+                    _errors[name] = str(e)
+            with _lock:
+                job["next_run"] = time.monotonic() + job["interval"]
+        with _lock:
+            next_run = min((job["next_run"] for job in _jobs.values()), default=now + 60)
+        _wakeup.wait(max(0.1, next_run - time.monotonic()))
+
+
+def get_snapshot(name, wait=0):
+    """Return (value, age in seconds) of the last good snapshot, or (None, None) if there is none yet.
+
+    `wait` bounds how long to block for the very first load; renders that can
+    show a placeholder should leave it at 0.
+    """
+    event = _ready.get(name)
+    if wait and event is not None:
+        event.wait(wait)
+    with _lock:
+        snapshot = _snapshots.get(name)
+    if snapshot is None:
+        return None, None
+    value, fetched_at = snapshot
+    return value, time.time() - fetched_at
+
+
+def refresh_now(name):
+    """Ask the refresher to reload a snapshot on its next pass"""
+    with _lock:
+        if name in _jobs:
+            _jobs[name]["next_run"] = 0
+    _wakeup.set()
+
+
+def last_error(name):
+    with _lock:
+        return _errors.get(name)
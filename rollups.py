@@ -0,0 +1,31 @@
+# Display helpers for the calendar rollups served by price_store.load_rollups.
+# Frames keep their DatetimeIndex; formatting to strings only happens here.
+
+
+def top_volume_months(monthly):
+    """Return the highest-volume month of every year from a monthly rollup"""
+    if monthly.empty:
+        return monthly
+    return monthly.loc[monthly.groupby(monthly.index.year)['Volume'].idxmax()]
+
+
+def format_yearly(yearly):
+    """Yearly rollup as a display table with a Year column"""
+    table = yearly.reset_index(drop=True)
+    table.insert(0, 'Year', yearly.index.strftime('%Y'))
+    return table
+
+
+def format_monthly(monthly):
+    """Monthly rollup as a display table with Year and Month columns"""
+    table = monthly.reset_index(drop=True)
+    table.insert(0, 'Month', monthly.index.strftime('%m'))
+    table.insert(0, 'Year', monthly.index.strftime('%Y'))
+    return table
+
+
+def format_dates(data):
+    """Bars as a display table with the index formatted as a YYYY-MM-DD Date column"""
+    table = data.reset_index(drop=True)
+    table.insert(0, 'Date', data.index.strftime('%Y-%m-%d'))
+    return table
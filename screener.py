@@ -0,0 +1,412 @@
+import ast
+import json
+from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+import price_store
+from indicators import compute_batch
+from symbols import nse_tickers, get_symbol_index
+
+# Cross-sectional screening over a whole universe. The last LOOKBACK_BARS bars of
+# every ticker are loaded into aligned (tickers x bars) close and volume matrices,
+# indicators are computed over the matrices with indicators.compute_batch, and the
+# latest values become one row per ticker that filter expressions run against.
+# Snapshots are cached per universe and patched with the tickers that changed.
+LOOKBACK_BARS = 260
+
+INDICATOR_SPECS = {
+    "sma_20": ("sma", {"window": 20, "min_periods": 20}),
+    "sma_50": ("sma", {"window": 50, "min_periods": 50}),
+    "sma_200": ("sma", {"window": 200, "min_periods": 200}),
+    "rsi": ("rsi", {"period": 14}),
+    "macd": ("macd", {}),
+    "bollinger": ("bollinger", {"window": 20}),
+}
+
+# Columns of a snapshot, usable by name in filter expressions
+FIELDS = {
+    "close": "Last close",
+    "change_pct": "1-day change %",
+    "change_5d_pct": "5-day change %",
+    "change_20d_pct": "20-day change %",
+    "volume": "Last volume",
+    "volume_ratio": "Volume / 20-day average volume",
+    "sma_20": "20-day SMA",
+    "sma_50": "50-day SMA",
+    "sma_200": "200-day SMA",
+    "rsi": "14-day RSI",
+    "rsi_change": "1-day RSI change",
+    "macd": "MACD line",
+    "macd_signal": "MACD signal line",
+    "macd_hist": "MACD histogram",
+    "bb_upper": "Upper Bollinger band",
+    "bb_lower": "Lower Bollinger band",
+    "above_sma_50": "Close above the 50-day SMA",
+    "above_sma_200": "Close above the 200-day SMA",
+    "crossed_above_sma_50": "Close crossed above the 50-day SMA today",
+    "crossed_below_sma_50": "Close crossed below the 50-day SMA today",
+    "golden_cross": "50-day SMA crossed above the 200-day SMA today",
+    "death_cross": "50-day SMA crossed below the 200-day SMA today",
+    "macd_bullish_cross": "MACD crossed above its signal line today",
+}
+
+
+# Ready-made screens: name -> (filter expression, sort field, ascending)
+PRESETS = {
+    "Crossed above the 50-day SMA today": ("crossed_above_sma_50", "change_pct", False),
+    "Top RSI movers": ("", "rsi_change", False),
+    "Overbought (RSI above 70)": ("rsi > 70", "rsi", False),
+    "Oversold (RSI below 30)": ("rsi < 30", "rsi", True),
+    "Golden cross today": ("golden_cross", "change_pct", False),
+    "Volume spike": ("volume_ratio > 2", "volume_ratio", False),
+    "Top gainers": ("", "change_pct", False),
+    "Top losers": ("", "change_pct", True),
+}
+
+
+def _load_bars(conn, tickers, start):
+    return conn.execute('''WITH wanted(ticker) AS (SELECT DISTINCT value FROM json_each(?))
+                           SELECT p.ticker, p.date, p.close, p.volume FROM wanted
+                           JOIN prices p ON p.ticker = wanted.ticker AND p.date >= ?
+                           ORDER BY p.ticker, p.date''',
+                        (json.dumps(list(tickers)), start)).fetchall()
+
+
+def _align(rows, dates, bars):
+    """Lay (ticker, date, close, volume) rows on the shared date axis `dates` (at most `bars` long)"""
+    frame = pd.DataFrame(rows, columns=['ticker', 'date', 'close', 'volume'])
+    ticker_index, symbols = pd.factorize(frame['ticker'])
+    bar_dates = frame['date'].to_numpy()
+    # Column of each bar on the axis, right-aligned when the store holds fewer
+    # than `bars` dates; bars older than the axis are dropped
+    keep = bar_dates >= dates[0]
+    column = np.searchsorted(dates, bar_dates) + (bars - len(dates))
+    close = np.full((len(symbols), bars), np.nan)
+    volume = np.full((len(symbols), bars), np.nan)
+    close[ticker_index[keep], column[keep]] = frame['close'].to_numpy(dtype=float)[keep]
+    volume[ticker_index[keep], column[keep]] = frame['volume'].to_numpy(dtype=float)[keep]
+    last_dates = frame.groupby(ticker_index)['date'].last().to_numpy()
+    return list(symbols), close, volume, list(last_dates)
+
+
+def _matrix(tickers, bars):
+    """Return (date axis, symbols, close, volume, last dates); see price_matrix"""
+    conn = price_store.connect()
+    try:
+        latest = conn.execute("SELECT MAX(date) FROM prices").fetchone()[0]
+        if latest is None:
+            return None, [], np.empty((0, bars)), np.empty((0, bars)), []
+        # Calendar days that hold `bars` trading days, with room for holidays
+        start = (datetime.strptime(latest, '%Y-%m-%d') - timedelta(days=bars * 7 // 5 + 15)).strftime('%Y-%m-%d')
+        rows = _load_bars(conn, tickers, start)
+    finally:
+        conn.close()
+    if not rows:
+        return None, [], np.empty((0, bars)), np.empty((0, bars)), []
+    dates = np.unique([row[1] for row in rows])[-bars:]
+    return (dates, *_align(rows, dates, bars))
+
+
+def price_matrix(tickers, bars=LOOKBACK_BARS):
+    """Return (symbols, close, volume, last dates) with close/volume as (tickers x bars) arrays.
+
+    Columns are the last `bars` trading dates of the store, shared by every
+    ticker, so the last column is the latest date and a ticker without a bar on
+    a date has NaN there. `last dates` is each ticker's own latest bar.
+    """
+    return _matrix(tickers, bars)[1:]
+
+
+def _at(matrix, last, back=0):
+    """Each row's value `back` columns before its own last bar (NaN before the first column)"""
+    column = last - back
+    values = matrix[np.arange(len(matrix)), np.maximum(column, 0)]
+    return np.where(column >= 0, values, np.nan)
+
+
+def _change_pct(close, last, days):
+    return (_at(close, last) / _at(close, last, days) - 1) * 100
+
+
+def _crossed(above, below, last):
+    """True where series `above` moved from <= to > `below` on each row's last bar"""
+    with np.errstate(invalid='ignore'):
+        return (_at(above, last) > _at(below, last)) & (_at(above, last, 1) <= _at(below, last, 1))
+
+
+def _indicator_rows(symbols, close, volume, last_dates):
+    """One row per ticker of its indicator values and signals as of its own last bar"""
+    # NaNs (short histories, missing closes) would poison the rolling sums: fill
+    # them from the nearest close and blank out the indicators a ticker's history
+    # is too short for
+    finite = np.isfinite(close)
+    first = np.argmax(finite, axis=1)
+    last = close.shape[1] - 1 - np.argmax(finite[:, ::-1], axis=1)
+    history = last - first + 1
+    close = pd.DataFrame(close).ffill(axis=1).to_numpy()
+    padded = pd.DataFrame(close).bfill(axis=1).to_numpy()
+    values = compute_batch(padded, INDICATOR_SPECS)
+    for name, (_, params) in INDICATOR_SPECS.items():
+        short = (history < params.get("window", params.get("period", 0) + 1))[:, None]
+        if isinstance(values[name], tuple):
+            values[name] = tuple(np.where(short, np.nan, output) for output in values[name])
+        else:
+            values[name] = np.where(short, np.nan, values[name])
+    sma_50, sma_200 = values["sma_50"], values["sma_200"]
+    macd, macd_signal, macd_hist = values["macd"]
+    _, bb_upper, bb_lower = values["bollinger"]
+    # The 20 bars before each ticker's last one
+    window = last[:, None] + np.arange(-20, 0)
+    previous_volume = np.where(window >= 0, volume[np.arange(len(volume))[:, None], np.maximum(window, 0)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_volume = np.nanmean(previous_volume, axis=1)
+        return pd.DataFrame({
+            "symbol": symbols,
+            "date": last_dates,
+            "close": _at(close, last),
+            "change_pct": _change_pct(close, last, 1),
+            "change_5d_pct": _change_pct(close, last, 5),
+            "change_20d_pct": _change_pct(close, last, 20),
+            "volume": _at(volume, last),
+            "volume_ratio": _at(volume, last) / average_volume,
+            "sma_20": _at(values["sma_20"], last),
+            "sma_50": _at(sma_50, last),
+            "sma_200": _at(sma_200, last),
+            "rsi": _at(values["rsi"], last),
+            "rsi_change": _at(values["rsi"], last) - _at(values["rsi"], last, 1),
+            "macd": _at(macd, last),
+            "macd_signal": _at(macd_signal, last),
+            "macd_hist": _at(macd_hist, last),
+            "bb_upper": _at(bb_upper, last),
+            "bb_lower": _at(bb_lower, last),
+            "above_sma_50": _at(close, last) > _at(sma_50, last),
+            "above_sma_200": _at(close, last) > _at(sma_200, last),
+            "crossed_above_sma_50": _crossed(close, sma_50, last),
+            "crossed_below_sma_50": _crossed(sma_50, close, last),
+            "golden_cross": _crossed(sma_50, sma_200, last),
+            "death_cross": _crossed(sma_200, sma_50, last),
+            "macd_bullish_cross": _crossed(macd, macd_signal, last),
+        })
+
+
+def _mask_stale(snapshot):
+    """Blank the rows of tickers whose last bar is older than the universe's latest session.
+
+    The session is the most common last date, so one ticker fetched ahead of the
+    rest (a dashboard view of today's bar) doesn't make every other ticker stale.
+    Stale tickers (suspended, delisted, not updated) keep their row, but with no
+    values for filters and sorting to act on.
+    """
+    if snapshot.empty:
+        return snapshot
+    session = snapshot['date'].mode().max()
+    stale = (snapshot['date'] < session).to_numpy()
+    if stale.any():
+        snapshot = snapshot.copy()
+        for field in FIELDS:
+            snapshot.loc[stale, field] = False if snapshot[field].dtype == bool else np.nan
+    return snapshot
+
+
+def _empty_snapshot():
+    return pd.DataFrame(columns=['symbol', 'date'] + list(FIELDS))
+
+
+def build_snapshot(tickers, bars=LOOKBACK_BARS):
+    """Latest indicator values and signals for every ticker, one row per symbol"""
+    symbols, close, volume, last_dates = price_matrix(tickers, bars)
+    if not symbols:
+        return _empty_snapshot()
+    return _mask_stale(_indicator_rows(symbols, close, volume, last_dates))
+
+
+# Snapshot state per universe (sorted ticker tuple): the store version it reflects,
+# its date axis and its unmasked indicator rows
+MAX_SNAPSHOTS = 8
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def _rebuild(entry, universe, bars):
+    dates, symbols, close, volume, last_dates = _matrix(universe, bars)
+    rows = _indicator_rows(symbols, close, volume, last_dates) if symbols else _empty_snapshot()
+    entry.update(dates=dates, rows=rows)
+
+
+def _patch(entry, changed, bars):
+    """Recompute the rows of `changed` tickers only, on the axis extended by their new dates"""
+    conn = price_store.connect()
+    try:
+        rows = _load_bars(conn, changed, entry['dates'][0])
+    finally:
+        conn.close()
+    dates = np.union1d(entry['dates'], [row[1] for row in rows])[-bars:]
+    unchanged = entry['rows'][~entry['rows']['symbol'].isin(changed)]
+    if rows:
+        patched = _indicator_rows(*_align(rows, dates, bars))
+        unchanged = pd.concat([unchanged, patched]).sort_values('symbol', ignore_index=True)
+    entry.update(dates=dates, rows=unchanged)
+
+
+def get_snapshot(tickers, bars=LOOKBACK_BARS):
+    """Snapshot for a universe, kept in step with the price store.
+
+    Only the rows of tickers written since the last call are recomputed, so a
+    dashboard view adding one ticker's bar costs one ticker's worth of work. A
+    full rebuild happens on first use or when much of the universe changed.
+    """
+    universe = tuple(sorted(set(tickers)))
+    with _snapshots_lock:
+        entry = _snapshots.get(universe)
+        if entry is None:
+            entry = _snapshots[universe] = {'lock': threading.Lock(), 'version': None}
+            while len(_snapshots) > MAX_SNAPSHOTS:
+                _snapshots.popitem(last=False)
+        _snapshots.move_to_end(universe)
+
+    with entry['lock']:
+        version = price_store.store_version()
+        if entry['version'] == version:
+            return entry['snapshot']
+        if entry['version'] is None or version < entry['version'] or entry['dates'] is None:
+            _rebuild(entry, universe, bars)
+        else:
+            wanted = set(universe)
+            changed = [ticker for ticker in price_store.changed_since(entry['version']) if ticker in wanted]
+            if len(changed) > len(universe) // 4:
+                _rebuild(entry, universe, bars)
+            elif changed:
+                _patch(entry, changed, bars)
+        entry['version'] = version
+        entry['snapshot'] = _mask_stale(entry['rows'])
+        return entry['snapshot']
+
+
+_COMPARISONS = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+}
+
+
+def _evaluate(node, columns):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, columns)
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result = _evaluate(node.values[0], columns)
+        for value in node.values[1:]:
+            result = combine(result, _evaluate(value, columns))
+        return result
+    if isinstance(node, ast.UnaryOp):
+        operand = _evaluate(node.operand, columns)
+        if isinstance(node.op, ast.Not):
+            return np.logical_not(operand)
+        if isinstance(node.op, ast.USub):
+            return -operand
+        if isinstance(node.op, ast.UAdd):
+            return operand
+    if isinstance(node, ast.Compare):
+        result, left = True, _evaluate(node.left, columns)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARISONS:
+                break
+            right = _evaluate(comparator, columns)
+            result = np.logical_and(result, _COMPARISONS[type(op)](left, right))
+            left = right
+        else:
+            return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(node.op)](_evaluate(node.left, columns), _evaluate(node.right, columns))
+    if isinstance(node, ast.Name):
+        if node.id not in columns:
+            raise ValueError(f"Unknown field '{node.id}'")
+        return columns[node.id]
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+        return node.value
+    raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
+
+
+def evaluate(expression, snapshot):
+    """Boolean mask of the snapshot rows matching a filter expression.
+
+    Expressions combine FIELDS with numbers, + - * /, comparisons and
+    and/or/not, e.g. "rsi > 70 and volume_ratio > 2" or "crossed_above_sma_50".
+    Nothing else is evaluated.
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    columns = {name: snapshot[name].to_numpy() for name in FIELDS}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mask = _evaluate(tree, columns)
+    mask = np.broadcast_to(np.asarray(mask), (len(snapshot),))
+    if snapshot.empty:
+        return mask.astype(bool)
+    if mask.dtype != bool:
+        raise ValueError("The expression must be a condition, e.g. rsi > 70")
+    return mask
+
+
+def screen(tickers, expression="", sort_by="change_pct", ascending=False, limit=50):
+    """Tickers matching `expression` (all when empty), sorted by a field"""
+    snapshot = get_snapshot(tickers)
+    if expression.strip():
+        snapshot = snapshot[evaluate(expression, snapshot)]
+    return snapshot.sort_values(sort_by, ascending=ascending, na_position='last').head(limit)
+
+
+def show_screener():
+    st.title("Stock Screener")
+    st.write("Filter the whole universe by price, volume and indicator conditions.")
+
+    universe = st.radio("Universe", ["Featured tickers", "All NSE symbols"], horizontal=True, key="screener_universe")
+    index = get_symbol_index()
+    if universe == "Featured tickers":
+        tickers = list(nse_tickers.values())
+    else:
+        tickers = [symbol for _, symbol in index.entries]
+
+    preset = st.selectbox("Screen", list(PRESETS), key="screener_preset")
+    default_expression, default_sort, default_ascending = PRESETS[preset]
+    expression = st.text_input("Filter", value=default_expression, key=f"screener_expression_{preset}",
+                               placeholder="e.g. rsi > 70 and volume_ratio > 2")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        fields = list(FIELDS)
+        sort_by = st.selectbox("Sort by", fields, index=fields.index(default_sort), key=f"screener_sort_{preset}")
+    with col2:
+        ascending = st.checkbox("Ascending", value=default_ascending, key=f"screener_ascending_{preset}")
+    with col3:
+        limit = st.number_input("Rows", min_value=10, max_value=500, value=50, step=10, key="screener_limit")
+
+    with st.expander("Fields"):
+        st.table(pd.DataFrame(FIELDS.items(), columns=['Field', 'Meaning']))
+
+    if st.button("Update Prices", key="screener_update"):
+        from forecast import update_prices
+        with st.spinner(f"Updating prices for {len(tickers)} tickers..."):
+            failed = update_prices(tickers, period="1y")
+        if failed:
+            st.warning(f"Could not update {len(failed)} tickers.")
+
+    start = time.perf_counter()
+    try:
+        results = screen(tickers, expression, sort_by, ascending, int(limit))
+    except ValueError as e:
+        st.error(str(e))
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+
+    results = results.copy()
+    results.insert(1, "name", [index.name_of(symbol) for symbol in results["symbol"]])
+    st.caption(f"{len(results)} matches from {len(tickers)} tickers in {elapsed:.0f} ms "
+               f"(prices as of the local store)")
+    st.dataframe(results, use_container_width=True, hide_index=True)
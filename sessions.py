@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from db import connection, transaction
+
+# Signed session tokens. A token carries the user's id, email and name, an expiry
+# and a random session id, signed with HMAC-SHA256, so restoring a session after a
+# rerun or reconnect is a signature check in memory instead of a users table
+# lookup and a password hash. Logging out revokes the session id: revocations are
+# written to users.db and kept in memory until the token would have expired anyway.
+#
+# Tokens never go into URLs. A remembered session is carried across reloads by a
+# one-time nonce instead: users.db maps it to the token, redeeming it deletes it,
+# and it expires after NONCE_TTL, so a leaked link is useless once opened or stale.
+SECRET_PATH = "session_secret.key"
+
+# Lifetime of a normal session, and of one the user asked to be remembered
+SESSION_TTL = 12 * 3600
+REMEMBER_TTL = 24 * 3600
+
+# Lifetime of an unredeemed nonce
+NONCE_TTL = 15 * 60
+
+MIN_SECRET_BYTES = 32
+
+_secret = None
+_secret_lock = threading.Lock()
+_revoked = None  # session id -> expiry of its token
+_lock = threading.Lock()
+
+
+def _load_secret():
+    """Signing key from SESSION_SECRET, else from a key file created on first use"""
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                env = os.getenv("SESSION_SECRET")
+                if env:
+                    secret = env.encode()
+                else:
+                    if not os.path.exists(SECRET_PATH):
+                        _create_secret()
+                    with open(SECRET_PATH) as f:
+                        secret = f.read().strip().encode()
+                # An empty or short key would make tokens forgeable
+                if len(secret) < MIN_SECRET_BYTES:
+                    raise RuntimeError(f"Session secret must be at least {MIN_SECRET_BYTES} bytes")
+                _secret = secret
+    return _secret
+
+
+def _create_secret():
+    # The key is written in full to a temporary file and then linked into place,
+    # so other processes see either no key file or a complete one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(SECRET_PATH)))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(temp_path, SECRET_PATH)
+        except FileExistsError:
+            # Another process got there first: use its key
+            pass
+    finally:
+        os.unlink(temp_path)
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _encode(hmac.new(_load_secret(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user, remember=False):
+    """Signed token for a user dict (id, email, name)"""
+    claims = {
+        "sid": secrets.token_hex(16),
+        "uid": user["id"],
+        "email": user["email"],
+        "name": user["name"],
+        "exp": int(time.time()) + (REMEMBER_TTL if remember else SESSION_TTL),
+    }
+    payload = _encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def _revocations():
+    global _revoked
+    if _revoked is None:
+        with _lock:
+            if _revoked is None:
+                with connection() as conn:
+                    rows = conn.execute("SELECT sid, expires_at FROM revoked_sessions WHERE expires_at > ?",
+                                        (time.time(),)).fetchall()
+                _revoked = dict(rows)
+    return _revoked
+
+
+def validate_token(token):
+    """Claims of a token if its signature checks out and it is neither expired nor revoked, else None"""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_decode(payload))
+    except (ValueError, AttributeError):
+        return None
+    if claims["exp"] <= time.time() or claims["sid"] in _revocations():
+        return None
+    return claims
+
+
+def _nonce_key(nonce):
+    # Only a hash is stored, so reading users.db doesn't yield live nonces
+    return hashlib.sha256(nonce.encode()).hexdigest()
+
+
+def issue_nonce(token):
+    """One-time nonce that redeem_nonce exchanges for a valid token within NONCE_TTL"""
+    claims = validate_token(token)
+    if claims is None:
+        return None
+    nonce = secrets.token_urlsafe(24)
+    now = time.time()
+    with transaction() as conn:
+        conn.execute("DELETE FROM session_nonces WHERE expires_at <= ?", (now,))
+        conn.execute("INSERT INTO session_nonces (nonce, token, expires_at) VALUES (?, ?, ?)",
+                     (_nonce_key(nonce), token, min(now + NONCE_TTL, claims["exp"])))
+    return nonce
+
+
+def redeem_nonce(nonce):
+    """Token a nonce was issued for if it is unused and unexpired, else None; either way it is used up"""
+    with transaction() as conn:
+        rows = conn.execute("DELETE FROM session_nonces WHERE nonce = ? RETURNING token, expires_at",
+                            (_nonce_key(nonce),)).fetchall()
+    if not rows or rows[0][1] <= time.time():
+        return None
+    return rows[0][0]
+
+
+def revoke_token(token):
+    """Revoke a token's session until the token would have expired"""
+    claims = validate_token(token)
+    if claims is None:
+        return
+    now = time.time()
+    revoked = _revocations()
+    with _lock:
+        revoked[claims["sid"]] = claims["exp"]
+        for sid in [sid for sid, expires_at in revoked.items() if expires_at <= now]:
+            del revoked[sid]
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO revoked_sessions (sid, expires_at) VALUES (?, ?)",
+                     (claims["sid"], claims["exp"]))
+        conn.execute("DELETE FROM revoked_sessions WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM session_nonces WHERE token = ?", (token,))
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Every cache created through `shared_cache`, by name, so counters can be inspected
+_caches = {}
+
+
+class TTLCache:
+    """Process-wide cache with a time-to-live, LRU eviction and single-flight loading.
+
+    Concurrent misses for the same key wait for the first caller's load instead of
+    starting their own, so a burst of sessions asking for the same data produces a
+    single upstream request.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_load(self, key, loader):
+        while True:
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        self._data.move_to_end(key)
+                        self.hits += 1
+                        return entry[1]
+                    del self._data[key]
+                    self.expirations += 1
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+            # Another thread is loading this key: wait, then look again. If its load
+            # failed nothing was stored and one of the waiters takes over.
+            event.wait()
+
+        try:
+            value = loader()
+            with self._lock:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def shared_cache(ttl=300, maxsize=256):
+    """Decorator caching a function's results in a process-wide TTLCache keyed by its arguments"""
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _caches[f"{func.__module__}.{func.__qualname__}"] = cache
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Return the counters of every shared cache, by function name"""
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,201 @@
+import argparse
+import bisect
+import csv
+import heapq
+import io
+import os
+import re
+import requests
+from shared_cache import shared_cache
+
+# NSE Ticker names featured across the app (dashboard defaults, game universe, scenarios)
+nse_tickers = {
+    "Wockhardt Ltd.": "WOCKPHARMA.NS",
+    "Zee Entertainment Enterprises Ltd.": "ZEEL.NS",
+    "V-Guard Industries Ltd.": "VGUARD.NS",
+    "Usha Martin Ltd.": "USHAMART.NS",
+    "Tejas Networks Ltd.": "TEJASNET.NS",
+    "Sundram Fasteners Ltd.": "SUNDRMFAST.NS",
+    "Rainbow Childrens Medicare Ltd.": "RAINBOW.NS",
+    "Ola Electric Mobility Ltd.": "OLAELEC.NS",
+    "Niva Bupa Health Insurance Company Ltd.": "NIVABUPA.NS",
+    "CreditAccess Grameen Ltd.": "CREDITACC.NS",
+    "Central Bank of India": "CENTRALBK.NS",
+    "Clean Science and Technology Ltd.": "CLEAN.NS",
+    "Aditya Birla Real Estate Ltd.": "ABREL.NS",
+    "ACME Solar Holdings Ltd.": "ACMESOLAR.NS",
+    "Ashok Leyland Ltd.": "ASHOKLEY.NS",
+    "BSE Ltd.": "BSE.NS",
+    "Dixon Technologies (India) Ltd.": "DIXON.NS",
+    "Fortis Healthcare Ltd.": "FORTIS.NS",
+    "Coforge Ltd.": "COFORGE.NS",
+    "Indus Towers Ltd.": "INDUSTOWER.NS",
+    "Jubilant Foodworks Ltd.":"JUBLFOOD.NS",
+    "Page Industries Ltd.":"PAGEIND.NS",
+    "Yes Bank Ltd.":"YESBANK.NS"
+}
+
+INDEX_TICKERS = {
+    "Sensex": "^BSESN",
+    "Nifty 50": "^NSEI",
+    "Bank Nifty": "^NSEBANK",
+    "Nifty IT": "^CNXIT",
+    "India VIX": "^INDIAVIX"
+}
+
+# NSE's list of every listed equity (same columns as EQUITY_L.csv)
+SYMBOL_MASTER_PATH = 'nse_symbols.csv'
+NSE_EQUITY_LIST_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+
+# Words too common in company names to be worth a key of their own ("... Limited")
+STOP_WORDS = frozenset(('limited', 'ltd', 'the', 'and', 'of'))
+
+# Results kept per prefix; larger k falls back to scanning the sorted keys
+TOP_K = 20
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def _trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def load_symbol_master(path=SYMBOL_MASTER_PATH):
+    """Return {company name: Yahoo symbol} for every listed NSE equity plus the featured tickers"""
+    master = {}
+    if os.path.exists(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+                symbol, name = row.get('SYMBOL'), row.get('NAME OF COMPANY')
+                if symbol and name:
+                    master[name] = f"{symbol}.NS"
+    master.update(nse_tickers)
+    return master
+
+
+def refresh_symbol_master(path=SYMBOL_MASTER_PATH, url=NSE_EQUITY_LIST_URL):
+    """Download NSE's equity list into `path`; returns the number of symbols"""
+    # NSE rejects requests without a browser user agent
+    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+    response.raise_for_status()
+    rows = list(csv.reader(io.StringIO(response.text)))
+    with open(path, "w", newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    get_symbol_index.cache.invalidate()
+    return max(len(rows) - 1, 0)
+
+
+class SymbolIndex:
+    """Prefix and fuzzy search over company names and symbols.
+
+    Keys are the normalized symbol, the full name and every word of the name
+    except stop words. The best TOP_K entries for every prefix of every key are
+    ranked when the index is built, so a lookup is a dict access however many
+    names share the prefix. When it returns fewer than k results the rest is
+    filled from a trigram index, which tolerates typos.
+    """
+
+    def __init__(self, master):
+        self.entries = sorted(master.items())  # [(name, symbol)]
+        self._names = {symbol: name for name, symbol in self.entries}
+        keys = []
+        self._trigram_index = {}
+        for entry_id, (name, symbol) in enumerate(self.entries):
+            base = _normalize(symbol.rsplit(".", 1)[0])
+            full_name = _normalize(name)
+            # Lower rank is better: symbol, then full name, then any word of the name
+            keys.append((base, 0, entry_id))
+            keys.append((full_name, 1, entry_id))
+            for word in full_name.split()[1:]:
+                if word not in STOP_WORDS:
+                    keys.append((word, 2, entry_id))
+            words = " ".join(word for word in full_name.split() if word not in STOP_WORDS)
+            for gram in _trigrams(f"{base} {words}"):
+                self._trigram_index.setdefault(gram, []).append(entry_id)
+        keys.sort()
+        self._keys = keys
+        self._key_text = [key[0] for key in keys]
+
+        candidates = {}  # prefix -> {entry_id: score}, filled in key order
+        for text, rank, entry_id in keys:
+            name_length = len(self.entries[entry_id][0])
+            for end in range(1, len(text) + 1):
+                scores = candidates.setdefault(text[:end], {})
+                score = self._score(rank, end != len(text), name_length)
+                if entry_id not in scores or score < scores[entry_id]:
+                    scores[entry_id] = score
+        self._top = {prefix: heapq.nsmallest(TOP_K, scores, key=scores.get) for prefix, scores in candidates.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def name_of(self, symbol):
+        return self._names.get(symbol, symbol)
+
+    @staticmethod
+    def _score(rank, partial, name_length):
+        # Exact matches beat prefix matches, shorter names beat longer ones
+        return rank, partial, name_length
+
+    def _scan(self, query):
+        """Every entry with a key starting with `query`, with its best score"""
+        best = {}
+        position = bisect.bisect_left(self._key_text, query)
+        while position < len(self._keys) and self._key_text[position].startswith(query):
+            text, rank, entry_id = self._keys[position]
+            score = self._score(rank, text != query, len(self.entries[entry_id][0]))
+            if entry_id not in best or score < best[entry_id]:
+                best[entry_id] = score
+            position += 1
+        return best
+
+    def search(self, query, k=10):
+        """Return up to k (name, symbol) matches, best first"""
+        query = _normalize(query)
+        if not query:
+            return self.entries[:k]
+
+        if k <= TOP_K:
+            # A list shorter than TOP_K holds every prefix match
+            best = self._top.get(query, [])
+            results = best[:k]
+        else:
+            best = self._scan(query)
+            results = heapq.nsmallest(k, best, key=best.get)
+
+        if len(results) < k:
+            grams = _trigrams(query)
+            overlap = {}
+            for gram in grams:
+                for entry_id in self._trigram_index.get(gram, ()):
+                    overlap[entry_id] = overlap.get(entry_id, 0) + 1
+            # Require at least half of the query's trigrams to match
+            threshold = max(1, len(grams) // 2)
+            fuzzy = [entry_id for entry_id, count in overlap.items() if count >= threshold and entry_id not in best]
+            results += heapq.nlargest(k - len(results), fuzzy, key=overlap.get)
+
+        return [self.entries[entry_id] for entry_id in results]
+
+
+@shared_cache(ttl=86400, maxsize=1)
+def get_symbol_index():
+    """Process-wide search index over the symbol master"""
+    return SymbolIndex(load_symbol_master())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the NSE symbol master")
+    parser.add_argument("command", choices=["refresh", "search"])
+    parser.add_argument("query", nargs="?", default="")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        print(f"Stored {refresh_symbol_master()} symbols in {SYMBOL_MASTER_PATH}")
+    else:
+        for name, symbol in get_symbol_index().search(args.query):
+            print(f"{symbol:20} {name}")
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pytest
+import price_store
+import screener
+
+DATES = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2025-01-01', periods=300)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, 'DB_PATH', str(tmp_path / 'prices.db'))
+    monkeypatch.setattr(price_store, '_initialized', False)
+    monkeypatch.setattr(screener, '_snapshots', OrderedDict())
+    conn = price_store.connect()
+    yield conn
+    conn.close()
+
+
+def _bars(ticker, dates, base):
+    return [(ticker, date, base + i, base + i, base + i, base + i, 1000.0 + i, 0.0, 0.0)
+            for i, date in enumerate(dates)]
+
+
+def test_one_ticker_ahead_does_not_blank_the_rest(store):
+    for ticker, base in (('A.NS', 100), ('B.NS', 50), ('C.NS', 10)):
+        price_store._store(store, ticker, _bars(ticker, DATES[:-1], base), DATES[0], replace_all=True)
+    before = screener.build_snapshot(['A.NS', 'B.NS', 'C.NS']).set_index('symbol')
+
+    # A dashboard view fetches today's bar for one ticker only
+    price_store._store(store, 'A.NS', _bars('A.NS', DATES, 100)[-1:], DATES[0])
+    after = screener.build_snapshot(['A.NS', 'B.NS', 'C.NS']).set_index('symbol')
+
+    assert after['rsi'].notna().all()
+    assert after.loc['A.NS', 'date'] == DATES[-1]
+    assert after.loc['A.NS', 'close'] == 100 + len(DATES) - 1
+    pd.testing.assert_series_equal(after.loc['B.NS'], before.loc['B.NS'])
+    pd.testing.assert_series_equal(after.loc['C.NS'], before.loc['C.NS'])
+
+
+def test_ticker_behind_the_session_is_blanked(store):
+    price_store._store(store, 'A.NS', _bars('A.NS', DATES, 100), DATES[0], replace_all=True)
+    price_store._store(store, 'B.NS', _bars('B.NS', DATES, 50), DATES[0], replace_all=True)
+    price_store._store(store, 'C.NS', _bars('C.NS', DATES[:-5], 10), DATES[0], replace_all=True)
+    snapshot = screener.build_snapshot(['A.NS', 'B.NS', 'C.NS']).set_index('symbol')
+
+    assert np.isnan(snapshot.loc['C.NS', 'rsi'])
+    assert not snapshot.loc['C.NS', 'above_sma_50']
+    assert snapshot.loc[['A.NS', 'B.NS'], 'rsi'].notna().all()
+    assert snapshot['above_sma_50'].dtype == bool
+
+
+def test_snapshot_patches_only_changed_tickers(store, monkeypatch):
+    tickers = [f'T{i}.NS' for i in range(8)]
+    for i, ticker in enumerate(tickers):
+        price_store._store(store, ticker, _bars(ticker, DATES[:-1], 10 * (i + 1)), DATES[0], replace_all=True)
+    screener.get_snapshot(tickers)
+
+    price_store._store(store, 'T3.NS', _bars('T3.NS', DATES, 40)[-1:], DATES[0])
+    loaded = []
+    load_bars = screener._load_bars
+    monkeypatch.setattr(screener, '_load_bars', lambda conn, wanted, start: loaded.append(wanted) or
+                        load_bars(conn, wanted, start))
+    snapshot = screener.get_snapshot(tickers)
+
+    assert loaded == [['T3.NS']]
+    pd.testing.assert_frame_equal(snapshot, screener.build_snapshot(tickers))
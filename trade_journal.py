@@ -0,0 +1,206 @@
+import atexit
+import copy
+import json
+import queue
+import threading
+from datetime import datetime
+from db import connection, transaction
+
+# Durable game state. Every trade and every change to the persisted session state
+# fields is appended to game_journal; every SNAPSHOT_EVERY events the session's
+# whole state is written as one compact snapshot, so restoring a game is the
+# latest snapshot plus a replay of the few events after it.
+#
+# Writes are queued and committed by a background thread, one transaction per
+# batch of whatever queued up during the previous commit (group commit), so the
+# game's buttons never wait on the disk. Snapshots are serialized there too: the
+# button only copies the state, which is cheap because trade records are never
+# modified once made.
+
+# Session state fields that make up a game
+FIELDS = (
+    'portfolio', 'cash', 'trades', 'challenges', 'tutorial_step', 'credits',
+    'scenario_active', 'scenario', 'scenario_trades', 'scenario_start_value', 'scenario_end_value',
+    'recommendation_purchased', 'recommendation_text',
+    'show_feedback', 'show_feedback_modal', 'feedback_text', 'last_scenario',
+)
+
+SNAPSHOT_EVERY = 200
+
+# Session state key counting the events journaled since the last snapshot
+EVENTS_KEY = 'journal_events'
+
+# Session state key naming the player the game in session state belongs to
+PLAYER_KEY = 'game_player'
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # NumPy scalars from price lookups
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Can't journal {type(value).__name__}")
+
+
+def _dumps(data):
+    return json.dumps(data, default=_json_default, separators=(',', ':'))
+
+
+def _trade_from_json(trade):
+    return {**trade, 'time': datetime.fromisoformat(trade['time'])}
+
+
+def _trade_columns(trades):
+    return {
+        'stock': [trade['stock'] for trade in trades],
+        'action': [trade['action'] for trade in trades],
+        'shares': [int(trade['shares']) for trade in trades],
+        'price': [float(trade['price']) for trade in trades],
+        'time': [trade['time'].isoformat() for trade in trades],
+    }
+
+
+def _trades_from_columns(columns):
+    return [{'stock': stock, 'action': action, 'shares': shares, 'price': price, 'time': time}
+            for stock, action, shares, price, time in zip(columns['stock'], columns['action'], columns['shares'],
+                                                          columns['price'],
+                                                          map(datetime.fromisoformat, columns['time']))]
+
+
+def _snapshot(state):
+    """JSON of a game copied with _copy_state; trade lists are stored column by column"""
+    fields = {field: value for field, value in state.items() if field not in ('trades', 'scenario_trades')}
+    return _dumps({'fields': fields,
+                   'trades': _trade_columns(state.get('trades', [])),
+                   'scenario_trades': _trade_columns(state.get('scenario_trades', []))})
+
+
+def _load_snapshot(data):
+    snapshot = json.loads(data)
+    state = snapshot['fields']
+    state['trades'] = _trades_from_columns(snapshot['trades'])
+    state['scenario_trades'] = _trades_from_columns(snapshot['scenario_trades'])
+    return state
+
+
+def _copy_state(state):
+    """Copy of the game fields, sharing the (never modified) trade records"""
+    return {field: list(state[field]) if field in ('trades', 'scenario_trades') else copy.deepcopy(state[field])
+            for field in FIELDS if field in state}
+
+
+def _write(batch):
+    with transaction() as conn:
+        for item in batch:
+            if item[0] == 'event':
+                conn.execute("INSERT INTO game_journal (user_id, kind, data, created_at) VALUES (?, ?, ?, ?)",
+                             item[1:])
+            else:
+                # A snapshot covers every event of the user written before it
+                _, user_id, state, created_at = item
+                state = _snapshot(state)
+                conn.execute('''INSERT OR REPLACE INTO game_snapshots (user_id, journal_id, state, created_at)
+                                SELECT ?, COALESCE(MAX(id), 0), ?, ? FROM game_journal WHERE user_id = ?''',
+                             (user_id, state, created_at, user_id))
+
+
+def _run_writer():
+    while True:
+        batch = [_queue.get()]
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write(batch)
+        except Exception as e:
+            print(f"Failed to write {len(batch)} game journal entries: {e}")
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _enqueue(item):
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_run_writer, name="trade-journal", daemon=True)
+                _writer.start()
+    _queue.put(item)
+
+
+def flush():
+    """Wait until everything journaled so far is committed"""
+    _queue.join()
+
+
+atexit.register(flush)
+
+
+def _record(user_id, state, kind, data):
+    _enqueue(('event', user_id, kind, _dumps(data), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    state[EVENTS_KEY] = state.get(EVENTS_KEY, 0) + 1
+    if state[EVENTS_KEY] >= SNAPSHOT_EVERY:
+        _enqueue(('snapshot', user_id, _copy_state(state), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        state[EVENTS_KEY] = 0
+
+
+def record_trade(user_id, state, trade):
+    """Journal a trade already applied to the session state (with the cash it left)"""
+    _record(user_id, state, 'trade', {'trade': trade, 'cash': state['cash']})
+
+
+def record_changes(user_id, state, *fields):
+    """Journal the current values of some session state fields"""
+    _record(user_id, state, 'set', {field: state[field] for field in fields})
+
+
+def _apply(state, kind, data):
+    if kind == 'trade':
+        trade = _trade_from_json(data['trade'])
+        portfolio = state.setdefault('portfolio', {})
+        change = trade['shares'] if trade['action'] == 'Buy' else -trade['shares']
+        portfolio[trade['stock']] = portfolio.get(trade['stock'], 0) + change
+        state['cash'] = data['cash']
+        state.setdefault('trades', []).append(trade)
+        if state.get('scenario_active'):
+            state.setdefault('scenario_trades', []).append(trade)
+    else:
+        if 'scenario_trades' in data:
+            data['scenario_trades'] = [_trade_from_json(trade) for trade in data['scenario_trades']]
+        state.update(data)
+
+
+def clear(state):
+    """Remove a game from the session state, so the next player starts from their own"""
+    for field in FIELDS + (EVENTS_KEY, PLAYER_KEY):
+        state.pop(field, None)
+
+
+def restore(user_id):
+    """A user's saved game as session state fields, or None if nothing was saved"""
+    flush()
+    with connection() as conn:
+        row = conn.execute("SELECT journal_id, state FROM game_snapshots WHERE user_id = ?", (user_id,)).fetchone()
+        state, after = {}, 0
+        if row is not None:
+            try:
+                state, after = _load_snapshot(row[1]), row[0]
+            except ValueError:
+                # Not JSON (an older binary snapshot): replay the whole journal instead
+                pass
+        tail = conn.execute("SELECT kind, data FROM game_journal WHERE user_id = ? AND id > ? ORDER BY id",
+                            (user_id, after)).fetchall()
+    if row is None and not tail:
+        return None
+    for kind, data in tail:
+        _apply(state, kind, json.loads(data))
+    state[EVENTS_KEY] = len(tail)
+    return state
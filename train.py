@@ -0,0 +1,129 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import price_store
+from features import lag_training_set
+from model_registry import FEATURES, LATEST_POINTER, MODELS_DIR
+
+# Trains the lag model the dashboard serves from the local price store.
+#
+# Each worker process reads one ticker's closes and reduces its lag training set
+# (with an intercept column) to the QR factors R and Q'y, a few dozen numbers no
+# matter how long the history is. Per-ticker models solve their own factors; the
+# pooled model solves all of them stacked, which gives the same fit as regressing
+# on every row at once while staying well conditioned for highly collinear lags.
+# The artifact is versioned by a hash of its contents, so the same data and
+# settings always give the same version.
+LAGS = len(FEATURES)
+
+# Per-ticker fits need comfortably more rows than parameters
+MIN_TICKER_ROWS = 30
+
+
+def ticker_factors(ticker_symbol, period):
+    """QR factors of one ticker's lag regression: (ticker, rows, first date, last date, R, Q'y) or None"""
+    dates, close = price_store.load_closes(ticker_symbol, period)
+    if len(close) <= LAGS:
+        return None
+    lags, target = lag_training_set(close, LAGS)
+    valid = np.isfinite(lags).all(axis=1) & np.isfinite(target)
+    if not valid.any():
+        return None
+    design = np.column_stack([np.ones(int(valid.sum())), lags[valid]])
+    q, r = np.linalg.qr(design)
+    return ticker_symbol, int(valid.sum()), dates[0], dates[-1], r, q.T @ target[valid]
+
+
+def _ticker_factors(args):
+    try:
+        return ticker_factors(*args)
+    except Exception as e:
+        print(f"Skipping {args[0]}: {e}")
+        return None
+
+
+def _solve(r, qty):
+    """Least-squares solution from (stacked) R factors: (intercept, coefficients)"""
+    solution = np.linalg.lstsq(r, qty, rcond=None)[0]
+    return float(solution[0]), solution[1:]
+
+
+def _fit(coef, intercept):
+    return {"coef": [round(float(value), 12) for value in coef], "intercept": round(float(intercept), 12)}
+
+
+def train(tickers, period="2y", per_ticker=False, max_workers=None):
+    """Fit the lag model over `tickers` and return the artifact as a dict"""
+    price_store.init_price_db()
+    tickers = sorted(set(tickers))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        factors = [f for f in pool.map(_ticker_factors, [(t, period) for t in tickers], chunksize=16) if f is not None]
+    if not factors:
+        raise ValueError("No ticker has enough stored history to train on")
+
+    intercept, coef = _solve(np.vstack([f[4] for f in factors]), np.concatenate([f[5] for f in factors]))
+    artifact = {
+        "model": "linear_lags",
+        "features": list(FEATURES),
+        "target": "next close",
+        "period": period,
+        "training_window": {"start": min(f[2] for f in factors), "end": max(f[3] for f in factors)},
+        "rows": sum(f[1] for f in factors),
+        "tickers": {f[0]: {"rows": f[1], "start": f[2], "end": f[3]} for f in factors},
+        **_fit(coef, intercept),
+    }
+    if per_ticker:
+        artifact["per_ticker"] = {}
+        for ticker_symbol, rows, _, _, r, qty in factors:
+            if rows >= MIN_TICKER_ROWS:
+                ticker_intercept, ticker_coef = _solve(r, qty)
+                artifact["per_ticker"][ticker_symbol] = _fit(ticker_coef, ticker_intercept)
+
+    content = json.dumps(artifact, sort_keys=True).encode('utf-8')
+    artifact["version"] = hashlib.sha256(content).hexdigest()[:12]
+    artifact["trained_at"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return artifact
+
+
+def save_artifact(artifact, models_dir=MODELS_DIR, make_latest=True):
+    """Write models/<version>.json and point models/latest.json at it; returns the artifact path"""
+    os.makedirs(models_dir, exist_ok=True)
+    file = f"{artifact['version']}.json"
+    path = os.path.join(models_dir, file)
+    with open(path, "w") as f:
+        json.dump(artifact, f, indent=1, sort_keys=True)
+    if make_latest:
+        pointer = os.path.join(models_dir, os.path.basename(LATEST_POINTER))
+        # Replace the pointer atomically so a running dashboard never reads half a file
+        with open(pointer + ".tmp", "w") as f:
+            json.dump({"version": artifact['version'], "file": file}, f)
+        os.replace(pointer + ".tmp", pointer)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the price prediction model from the local price store")
+    parser.add_argument("symbols", nargs="*", help="Symbols to train on (default: the dashboard universe)")
+    parser.add_argument("--all", action="store_true", help="Use every NSE symbol in the symbol master")
+    parser.add_argument("--period", default="2y", help="Training window, as a yfinance period")
+    parser.add_argument("--per-ticker", action="store_true", help="Also fit a model per ticker")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--update", action="store_true", help="Update the price store first")
+    parser.add_argument("--no-latest", action="store_true", help="Don't make this the served model")
+    args = parser.parse_args()
+
+    from symbols import nse_tickers, get_symbol_index
+    if args.all:
+        symbols = [symbol for _, symbol in get_symbol_index().entries]
+    else:
+        symbols = args.symbols or list(nse_tickers.values())
+    if args.update:
+        from forecast import update_prices
+        update_prices(symbols, period=args.period)
+    artifact = train(symbols, period=args.period, per_ticker=args.per_ticker, max_workers=args.workers)
+    path = save_artifact(artifact, make_latest=not args.no_latest)
+    print(f"Trained {artifact['version']} on {artifact['rows']} rows from {len(artifact['tickers'])} tickers: {path}")